@@ -6,14 +6,11 @@ if __name__ == "__main__":
     if 'data' not in st.session_state:
         from dailysalesdashboard.utils import load_data
         st.session_state.data = load_data()
-    if 'sales_data' not in st.session_state:
-        st.session_state.sales_data = {}
-    if 'previous_year_month' not in st.session_state:
-        st.session_state.previous_year_month = ""
+    if 'entry' not in st.session_state:
+        from dailysalesdashboard.session import EntrySession
+        st.session_state.entry = EntrySession()
     if 'form_submitted' not in st.session_state:
         st.session_state.form_submitted = False
-    if 'previous_value' not in st.session_state:
-        st.session_state.previous_value = {}
         
     try:
         main()
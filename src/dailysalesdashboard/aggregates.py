@@ -0,0 +1,129 @@
+import pandas as pd
+import calendar
+import os
+
+from .utils import write_csv_atomic
+
+# 日別集計ファイルの保存先
+AGGREGATE_DIR = "aggregates"
+AGGREGATE_PATH = os.path.join(AGGREGATE_DIR, "daily_totals.csv")
+
+# 集計項目（売上入力画面のキーと同じ名前を使用）
+TIME_SLOTS = {"昼営業": "lunch", "夜営業": "dinner"}
+PAYMENT_TYPES = ["card", "paypay", "stella"]
+AGGREGATE_FIELDS = ["lunch", "dinner"] + PAYMENT_TYPES
+AGGREGATE_COLUMNS = ["日付"] + AGGREGATE_FIELDS
+
+
+def month_key(year, month):
+    """年月を'YYYY-MM'形式のキーに変換する"""
+    return f"{year}-{month:02d}"
+
+
+def empty_aggregates():
+    """空の日別集計を作成する"""
+    columns = {"日付": pd.Series(dtype=object)}
+    columns.update({field: pd.Series(dtype="int64") for field in AGGREGATE_FIELDS})
+    return pd.DataFrame(columns)
+
+
+def build_daily_aggregates(df):
+    """売上データから日別集計（昼営業・夜営業・支払方法別）を作成する"""
+    if df.empty:
+        return empty_aggregates()
+
+    data = df[["日付", "時間帯", "支払方法", "売上金額"]].copy()
+    data["日付"] = data["日付"].astype(str)
+    data["売上金額"] = pd.to_numeric(data["売上金額"], errors="coerce").fillna(0)
+
+    # 支払方法の行はそのまま、それ以外は時間帯で昼営業/夜営業に振り分ける
+    is_payment = data["支払方法"].isin(PAYMENT_TYPES)
+    data["項目"] = data["支払方法"].where(is_payment, data["時間帯"].map(TIME_SLOTS))
+    data = data.dropna(subset=["項目"])
+    if data.empty:
+        return empty_aggregates()
+
+    pivoted = data.pivot_table(index="日付", columns="項目", values="売上金額",
+                               aggfunc="sum", fill_value=0)
+    pivoted = pivoted.reindex(columns=AGGREGATE_FIELDS, fill_value=0).astype("int64")
+    pivoted.columns.name = None
+    return pivoted.sort_index().reset_index()
+
+
+def load_aggregates(path=AGGREGATE_PATH):
+    """日別集計を読み込む"""
+    try:
+        if os.path.exists(path):
+            agg = pd.read_csv(path, dtype={"日付": str})
+            return agg.reindex(columns=AGGREGATE_COLUMNS, fill_value=0)
+        return empty_aggregates()
+    except Exception as e:
+        print(f"集計データ読み込みエラー: {e}")
+        return empty_aggregates()
+
+
+def save_aggregates(agg, path=AGGREGATE_PATH):
+    """日別集計を保存する"""
+    try:
+        write_csv_atomic(agg, path)
+        return True
+    except Exception as e:
+        print(f"集計データ保存エラー: {e}")
+        return False
+
+
+def update_aggregates(df, months=None, path=AGGREGATE_PATH):
+    """
+    日別集計を更新する
+    monthsを指定した場合はその月（'YYYY-MM'）だけを再集計し、それ以外の月は既存の集計を使う
+    """
+    if months is None:
+        return save_aggregates(build_daily_aggregates(df), path)
+
+    months = set(months)
+    agg = load_aggregates(path)
+    agg = agg[~agg["日付"].str[:7].isin(months)]
+
+    month_rows = df[df["日付"].astype(str).str[:7].isin(months)]
+    updated = build_daily_aggregates(month_rows)
+
+    frames = [frame for frame in (agg, updated) if not frame.empty]
+    agg = pd.concat(frames, ignore_index=True) if frames else empty_aggregates()
+    return save_aggregates(agg.sort_values("日付", ignore_index=True), path)
+
+
+def ensure_aggregates(df, path=AGGREGATE_PATH):
+    """日別集計ファイルがなければ売上データから作成する"""
+    if not os.path.exists(path) and not df.empty:
+        return update_aggregates(df, path=path)
+    return True
+
+
+def daily_summary(agg, target_date):
+    """指定日の売上集計を返す"""
+    rows = agg[agg["日付"] == target_date.strftime("%Y-%m-%d")]
+    totals = {field: int(rows[field].sum()) for field in AGGREGATE_FIELDS}
+    totals["total"] = totals["lunch"] + totals["dinner"]
+    return totals
+
+
+def month_to_date_summary(agg, target_date):
+    """指定日までの月間累計を返す"""
+    month_start = target_date.replace(day=1).strftime("%Y-%m-%d")
+    rows = agg[(agg["日付"] >= month_start) &
+               (agg["日付"] <= target_date.strftime("%Y-%m-%d"))]
+    totals = {field: int(rows[field].sum()) for field in AGGREGATE_FIELDS}
+    totals["total"] = totals["lunch"] + totals["dinner"]
+    totals["days"] = int(len(rows))
+    totals["is_month_end"] = target_date.day == calendar.monthrange(target_date.year, target_date.month)[1]
+    return totals
+
+
+if __name__ == "__main__":
+    # 保存されている売上データから日別集計を作り直す
+    from .utils import load_data
+    data = load_data()
+    if update_aggregates(data):
+        print(f"日別集計を作成しました: {AGGREGATE_PATH}")
+        from .anomaly import update_anomalies
+        update_anomalies()
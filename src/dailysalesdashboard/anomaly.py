@@ -0,0 +1,161 @@
+import pandas as pd
+import numpy as np
+import calendar
+import os
+
+from .aggregates import AGGREGATE_DIR, load_aggregates
+from .utils import write_csv_atomic
+
+ANOMALY_PATH = os.path.join(AGGREGATE_DIR, "anomalies.csv")
+ANOMALY_COLUMNS = ["日付", "項目", "売上金額", "基準値", "スコア"]
+
+# 同じ曜日の過去何週分を基準にするか
+WINDOW_WEEKS = 8
+# 基準を計算するのに必要な最低日数
+MIN_SAMPLES = 4
+# 修正Zスコアがこの値を超えたら異常とみなす
+THRESHOLD = 3.5
+# MADが極端に小さい場合の下限（中央値に対する比率）
+MIN_MAD_RATIO = 0.05
+
+FIELD_LABELS = {"lunch": "昼営業", "dinner": "夜営業"}
+
+
+def _weekday_lags(series, dates):
+    """各日付について、同じ曜日の過去WINDOW_WEEKS週分の値を並べた行列を返す（0は休業日として除外）"""
+    lags = np.column_stack([
+        series.reindex(dates - pd.Timedelta(days=7 * k)).to_numpy(dtype=float)
+        for k in range(1, WINDOW_WEEKS + 1)
+    ])
+    lags[lags <= 0] = np.nan
+    return lags
+
+
+def _baselines(series, dates):
+    """各日付の基準値（中央値）とMADを計算する"""
+    lags = _weekday_lags(series, dates)
+    counts = np.sum(~np.isnan(lags), axis=1)
+    enough = counts >= MIN_SAMPLES
+
+    median = np.full(len(dates), np.nan)
+    mad = np.full(len(dates), np.nan)
+    if enough.any():
+        median[enough] = np.nanmedian(lags[enough], axis=1)
+        mad[enough] = np.nanmedian(np.abs(lags[enough] - median[enough, None]), axis=1)
+        mad[enough] = np.maximum(mad[enough], median[enough] * MIN_MAD_RATIO)
+    return median, mad
+
+
+def _score(value, median, mad):
+    """修正Zスコアを計算する"""
+    return 0.6745 * (value - median) / mad
+
+
+def detect_anomalies(agg, start_date, end_date):
+    """指定期間の日別集計から異常な日を検出する"""
+    if agg.empty:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+    indexed = agg.set_index(pd.to_datetime(agg["日付"]))
+    target = indexed.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+    if target.empty:
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+    flags = []
+    for field in FIELD_LABELS:
+        values = target[field].to_numpy(dtype=float)
+        median, mad = _baselines(indexed[field], target.index)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scores = _score(values, median, mad)
+        flagged = (values > 0) & (np.abs(np.nan_to_num(scores)) > THRESHOLD)
+        for i in np.flatnonzero(flagged):
+            flags.append({
+                "日付": target["日付"].iloc[i],
+                "項目": field,
+                "売上金額": int(values[i]),
+                "基準値": int(median[i]),
+                "スコア": round(float(scores[i]), 2),
+            })
+    return pd.DataFrame(flags, columns=ANOMALY_COLUMNS)
+
+
+def load_anomalies(path=ANOMALY_PATH):
+    """保存済みの異常検知結果を読み込む"""
+    try:
+        if os.path.exists(path):
+            return pd.read_csv(path, dtype={"日付": str})
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+    except Exception as e:
+        print(f"異常検知データ読み込みエラー: {e}")
+        return pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+
+def update_anomalies(months=None, agg=None, path=ANOMALY_PATH):
+    """
+    異常検知結果を更新する
+    monthsを指定した場合は、その月と、その月の値を基準に使う後続WINDOW_WEEKS週分だけを再計算する
+    """
+    if agg is None:
+        agg = load_aggregates()
+
+    try:
+        if months is None or agg.empty:
+            start = agg["日付"].min() if not agg.empty else None
+            end = agg["日付"].max() if not agg.empty else None
+            flags = detect_anomalies(agg, start, end) if start else pd.DataFrame(columns=ANOMALY_COLUMNS)
+        else:
+            months = sorted(months)
+            start = pd.Timestamp(f"{months[0]}-01")
+            last_year, last_month = (int(v) for v in months[-1].split("-"))
+            end = pd.Timestamp(last_year, last_month, calendar.monthrange(last_year, last_month)[1])
+            end += pd.Timedelta(days=7 * WINDOW_WEEKS)
+
+            flags = load_anomalies(path)
+            flag_dates = pd.to_datetime(flags["日付"])
+            flags = flags[(flag_dates < start) | (flag_dates > end)]
+            updated = detect_anomalies(agg, start, end)
+            frames = [frame for frame in (flags, updated) if not frame.empty]
+            flags = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=ANOMALY_COLUMNS)
+
+        write_csv_atomic(flags.sort_values("日付"), path)
+        return True
+    except Exception as e:
+        print(f"異常検知データ保存エラー: {e}")
+        return False
+
+
+def month_baselines(agg, year, month):
+    """売上入力画面用に、指定月の各日の基準値（中央値, MAD）を返す"""
+    _, last_day = calendar.monthrange(year, month)
+    dates = pd.date_range(f"{year}-{month:02d}-01", periods=last_day, freq="D")
+    baselines = {day: {} for day in range(1, last_day + 1)}
+    if agg.empty:
+        return baselines
+
+    indexed = agg.set_index(pd.to_datetime(agg["日付"]))
+    for field in FIELD_LABELS:
+        median, mad = _baselines(indexed[field], dates)
+        for i, date in enumerate(dates):
+            if not np.isnan(median[i]):
+                baselines[date.day][field] = (median[i], mad[i])
+    return baselines
+
+
+def anomaly_message(value, field, baseline):
+    """入力値が基準から大きく外れている場合に警告メッセージを返す"""
+    if not baseline or value <= 0:
+        return ""
+    median, mad = baseline
+    if abs(_score(value, median, mad)) <= THRESHOLD:
+        return ""
+    return f"通常の{FIELD_LABELS[field]}売上（¥{median:,.0f}）と大きく異なります"
+
+
+def format_flags(flags):
+    """日別売上表に表示する警告文を日付ごとにまとめる"""
+    messages = {}
+    for row in flags.itertuples(index=False):
+        direction = "高い" if row.売上金額 > row.基準値 else "低い"
+        text = f"⚠️ {FIELD_LABELS[row.項目]}が通常（¥{row.基準値:,.0f}）より{direction}"
+        messages.setdefault(row.日付, []).append(text)
+    return {date: " / ".join(texts) for date, texts in messages.items()}
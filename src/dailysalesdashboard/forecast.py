@@ -0,0 +1,246 @@
+"""
+月末着地見込みと翌月予測
+日別集計の時間帯ごとの売上に「トレンド＋曜日」の線形モデルを最小二乗法で当てはめ、全月分をまとめて計算する
+モデルは営業日の売上に当てはめ、予測は曜日ごとの営業日の割合を掛ける（定休日の曜日は0になる）
+複数店舗はプロセスプールで並列に計算する
+結果はデータのバージョン（日別集計のハッシュ値）とともに保存し、画面では保存済みの結果を読むだけにする
+    python -m dailysalesdashboard.forecast
+"""
+import argparse
+import calendar
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import AGGREGATE_PATH, load_aggregates
+from .utils import atomic_write
+
+FORECAST_FIELDS = ["lunch", "dinner"]
+# 学習に使う直近の日数と、予測に必要な最低日数
+TRAIN_DAYS = 84
+MIN_TRAIN_DAYS = 14
+
+
+def forecast_path(aggregate_path=AGGREGATE_PATH):
+    """日別集計と同じ場所に置く予測ファイルのパス"""
+    return os.path.join(os.path.dirname(aggregate_path), "forecasts.json")
+
+
+def dataset_version(aggregate_path=AGGREGATE_PATH):
+    """日別集計の内容から求めたバージョン（ファイルがない場合はNone）"""
+    try:
+        with open(aggregate_path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+def _weekdays(days):
+    """日番号の曜日（月曜=0）"""
+    return (days + 3) % 7  # 1970-01-01は木曜日
+
+
+def _design(days, origin, weekdays):
+    """
+    週単位のトレンドと、指定した曜日ごとの水準（切片の代わりに曜日ごとのダミー変数）の説明変数行列
+    学習データにある曜日だけを列にするため、定休日があっても列が線形従属にならない
+    """
+    X = np.zeros((len(days), 1 + len(weekdays)))
+    X[:, 0] = (days - origin) / 7.0
+    day_weekdays = _weekdays(days)
+    for column, weekday in enumerate(weekdays, start=1):
+        X[:, column] = day_weekdays == weekday
+    return X
+
+
+def _open_rates(days, train, start, as_of):
+    """学習期間の曜日ごとの営業日の割合（売上のある日数 / 暦日数）"""
+    calendar_days = _weekdays(np.arange(start, as_of + 1))
+    open_days = _weekdays(days[train])
+    rates = np.zeros(7)
+    for weekday in range(7):
+        total = np.count_nonzero(calendar_days == weekday)
+        if total:
+            rates[weekday] = np.count_nonzero(open_days == weekday) / total
+    return rates
+
+
+def _predict(days, origin, weekdays, coef, rates):
+    """営業日の売上の予測に曜日ごとの営業日の割合を掛ける"""
+    predicted = np.clip(_design(days, origin, weekdays) @ coef, 0, None)
+    return predicted * rates[_weekdays(days)]
+
+
+def _month_bounds(year, month):
+    """月初と月末の日番号（1970-01-01からの日数）"""
+    first = np.datetime64(f"{year}-{month:02d}-01", "D").astype(np.int64)
+    return first, first + calendar.monthrange(year, month)[1] - 1
+
+
+def forecast_months(days, series, months):
+    """
+    指定した各月について、その月の最終入力日時点の月末着地見込みと翌月予測を計算する
+    days: 日番号の配列（昇順）、series: 時間帯ごとの売上の配列
+    """
+    results = {}
+    for month in months:
+        year, month_num = (int(v) for v in month.split("-"))
+        first, last = _month_bounds(year, month_num)
+        next_year, next_month = (year + 1, 1) if month_num == 12 else (year, month_num + 1)
+        next_first, next_last = _month_bounds(next_year, next_month)
+
+        in_month = (days >= first) & (days <= last)
+        if not in_month.any():
+            continue
+        as_of = days[in_month].max()
+        remaining = np.arange(as_of + 1, last + 1)
+        next_days = np.arange(next_first, next_last + 1)
+
+        entry = {"as_of": str(np.datetime64(int(as_of), "D"))}
+        window_start = max(as_of - TRAIN_DAYS + 1, days[0])
+        for field in FORECAST_FIELDS:
+            values = series[field]
+            train = (days >= window_start) & (days <= as_of) & (values > 0)
+            if train.sum() < MIN_TRAIN_DAYS:
+                continue
+            weekdays = sorted(set(_weekdays(days[train]).tolist()))
+            coef, *_ = np.linalg.lstsq(_design(days[train], as_of, weekdays), values[train], rcond=None)
+            rates = _open_rates(days, train, window_start, as_of)
+            predicted_remaining = _predict(remaining, as_of, weekdays, coef, rates)
+            predicted_next = _predict(next_days, as_of, weekdays, coef, rates)
+            actual = values[in_month & (days <= as_of)].sum()
+            entry[field] = {
+                "actual": int(actual),
+                "month_end": int(round(actual + predicted_remaining.sum())),
+                "next_month": int(round(predicted_next.sum())),
+            }
+        if len(entry) > 1:
+            results[month] = entry
+    return results
+
+
+def fit_forecasts(agg):
+    """1店舗の全月分の予測をまとめて計算する"""
+    if agg.empty:
+        return {}
+    days = pd.to_datetime(agg["日付"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+    series = {field: agg[field].to_numpy(dtype=float) for field in FORECAST_FIELDS}
+    months = sorted(set(agg["日付"].str[:7]))
+    return forecast_months(days, series, months)
+
+
+def load_forecasts(aggregate_path=AGGREGATE_PATH):
+    """保存済みの予測を読み込む"""
+    try:
+        with open(forecast_path(aggregate_path), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"version": None, "forecasts": {}}
+
+
+def refresh_forecasts(aggregate_path=AGGREGATE_PATH, force=False):
+    """日別集計が更新されていれば予測を計算し直して保存する"""
+    version = dataset_version(aggregate_path)
+    if version is None:
+        return False
+    if not force and load_forecasts(aggregate_path).get("version") == version:
+        return False
+
+    started = time.perf_counter()
+    forecasts = fit_forecasts(load_aggregates(aggregate_path))
+    content = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.perf_counter() - started, 3),
+        "forecasts": forecasts,
+    }
+    with atomic_write(forecast_path(aggregate_path)) as f:
+        json.dump(content, f, ensure_ascii=False)
+    return True
+
+
+def refresh_all(aggregate_paths, force=False, workers=None):
+    """複数店舗の予測をプロセスプールで並列に更新する"""
+    if len(aggregate_paths) <= 1:
+        return [refresh_forecasts(path, force) for path in aggregate_paths]
+    workers = workers or min(os.cpu_count() or 1, len(aggregate_paths))
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(refresh_forecasts, aggregate_paths, [force] * len(aggregate_paths)))
+
+
+_refresh_state = {"running": False, "pending": False}
+_refresh_lock = threading.Lock()
+
+
+def _refresh_loop():
+    while True:
+        try:
+            refresh_forecasts()
+        except Exception as e:
+            print(f"予測の更新エラー: {e}")
+        with _refresh_lock:
+            if not _refresh_state["pending"]:
+                _refresh_state["running"] = False
+                return
+            _refresh_state["pending"] = False
+
+
+def schedule_refresh():
+    """予測の再計算をバックグラウンドで開始する（実行中の場合は終了後にもう一度計算する）"""
+    with _refresh_lock:
+        if _refresh_state["running"]:
+            _refresh_state["pending"] = True
+            return
+        _refresh_state["running"] = True
+    threading.Thread(target=_refresh_loop, daemon=True).start()
+
+
+def lookup_forecast(forecasts, year, month):
+    """
+    指定月の予測を返す
+    その月のデータがあれば月末着地見込みと翌月予測、なければ前月時点での当月予測を返す
+    """
+    def pick(entry, kind):
+        return {field: entry[field][kind] for field in FORECAST_FIELDS if field in entry}
+
+    entry = forecasts.get(f"{year}-{month:02d}")
+    if entry:
+        return {"as_of": entry["as_of"], "month_end": pick(entry, "month_end"),
+                "next_month": pick(entry, "next_month")}
+
+    previous = forecasts.get(f"{year - 1}-12" if month == 1 else f"{year}-{month - 1:02d}")
+    if previous:
+        return {"as_of": previous["as_of"], "month_end": pick(previous, "next_month"),
+                "next_month": None}
+    return None
+
+
+def main(argv=None):
+    from .scheduler import load_config
+
+    parser = argparse.ArgumentParser(description="月末着地見込みと翌月予測の一括計算")
+    parser.add_argument("--config", default="scheduler_config.json", help="店舗設定（JSON）")
+    parser.add_argument("--force", action="store_true", help="バージョンが同じでも計算し直す")
+    args = parser.parse_args(argv)
+
+    stores = load_config(args.config)["stores"]
+    paths = [store.get("aggregates_path", AGGREGATE_PATH) for store in stores]
+    started = time.perf_counter()
+    results = refresh_all(paths, force=args.force)
+    for store, updated in zip(stores, results):
+        print(f"[forecast] {store['name']}: {'更新' if updated else '変更なし'}")
+    print(f"[forecast] {len(stores)}店舗 {time.perf_counter() - started:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,308 @@
+"""
+POSの取引ログ（1取引1行のCSV）を取り込み、日別の売上データに集約する
+営業日は翌朝5時までのため、1日分のログに前日の営業日の取引が含まれることがある
+日ごとにどのログから何円を取り込んだかを記録し（utils.load_ingest_ledger）、
+営業日当日の取引を含む日は全ログの合計で置き換え、翌朝の取引だけの日は保存済みの売上にそのログの分を加える
+    python -m dailysalesdashboard.ingest pos_log_0101.csv pos_log_0102.csv
+"""
+import argparse
+import io
+import json
+import os
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .aggregates import AGGREGATE_DIR, update_aggregates
+from .anomaly import update_anomalies
+from .snapshots import ensure_baseline, record_snapshot
+from .forecast import refresh_forecasts
+from .utils import (atomic_write, load_data, save_data, build_sales_records,
+                    load_ingest_ledger, save_ingest_ledger)
+
+CHECKPOINT_PATH = os.path.join(AGGREGATE_DIR, "ingest_checkpoint.json")
+
+# 営業日の切り替え時刻（これより前の取引は前日の夜営業として扱う）
+BUSINESS_DAY_START_HOUR = 5
+# 夜営業の開始時刻
+DINNER_START_HOUR = 16
+
+# POSの支払種別と売上入力の支払方法の対応（ここにない種別は時間帯の集計にのみ含める）
+TENDER_MAP = {
+    "card": "card",
+    "credit": "card",
+    "クレジット": "card",
+    "カード": "card",
+    "paypay": "paypay",
+    "stella": "stella",
+}
+
+FIELDS = ["lunch", "dinner", "card", "paypay", "stella"]
+PAYMENT_FIELDS = ["card", "paypay", "stella"]
+
+
+@dataclass
+class IngestStats:
+    """取り込み処理の計測結果"""
+    rows: int = 0
+    skipped_rows: int = 0
+    bytes_read: int = 0
+    seconds: float = 0.0
+
+    def format(self):
+        rate = self.rows / self.seconds if self.seconds else 0.0
+        mb_rate = self.bytes_read / 1_000_000 / self.seconds if self.seconds else 0.0
+        return (f"[ingest] {self.rows:,}行 ({self.skipped_rows:,}行スキップ) "
+                f"{self.seconds:.2f}s {rate:,.0f}行/s {mb_rate:.1f}MB/s")
+
+
+def load_checkpoint(path=CHECKPOINT_PATH):
+    """チェックポイント（取り込み中のログごとの読み込み位置と途中の集計）を読み込む"""
+    if not os.path.exists(path):
+        return {"files": {}}
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    checkpoint.setdefault("files", {})
+    return checkpoint
+
+
+def save_checkpoint(checkpoint, path=CHECKPOINT_PATH):
+    """チェックポイントを書き込む（途中で中断されても壊れないように置き換える）"""
+    with atomic_write(path) as f:
+        json.dump(checkpoint, f, ensure_ascii=False)
+
+
+def aggregate_chunk(chunk, totals, main_days, timestamp_col, tender_col, amount_col):
+    """
+    取引ログの1チャンクを日別の集計（totals）に加算する
+    営業日当日（5時以降）の取引があった営業日はmain_daysに加える
+    """
+    timestamps = pd.to_datetime(chunk[timestamp_col], errors="coerce")
+    amounts = pd.to_numeric(chunk[amount_col], errors="coerce")
+    valid = timestamps.notna() & amounts.notna()
+    timestamps = timestamps[valid]
+    amounts = amounts[valid].astype("int64")
+    skipped = int((~valid).sum())
+
+    # 営業日と時間帯の判定
+    business_dates = (timestamps - pd.Timedelta(hours=BUSINESS_DAY_START_HOUR)).dt.strftime("%Y-%m-%d")
+    main_days.update(business_dates[business_dates == timestamps.dt.strftime("%Y-%m-%d")].unique())
+    hours = timestamps.dt.hour
+    is_lunch = (hours >= BUSINESS_DAY_START_HOUR) & (hours < DINNER_START_HOUR)
+    slots = pd.Series("dinner", index=timestamps.index).where(~is_lunch, "lunch")
+
+    tenders = chunk.loc[valid, tender_col].astype(str).str.strip().str.lower().map(TENDER_MAP)
+
+    # チャンク内で集計してから加算するため、保持するのは日数分の値だけ
+    for (day, field), amount in amounts.groupby([business_dates, slots]).sum().items():
+        day_totals = totals.setdefault(day, dict.fromkeys(FIELDS, 0))
+        day_totals[field] += int(amount)
+
+    has_tender = tenders.notna()
+    if has_tender.any():
+        grouped = amounts[has_tender].groupby([business_dates[has_tender], tenders[has_tender]]).sum()
+        for (day, field), amount in grouped.items():
+            day_totals = totals.setdefault(day, dict.fromkeys(FIELDS, 0))
+            day_totals[field] += int(amount)
+
+    return skipped
+
+
+def stream_log(source, totals, main_days, checkpoint, chunk_rows=100_000, checkpoint_every=10,
+               timestamp_col="timestamp", tender_col="tender", amount_col="amount",
+               checkpoint_path=CHECKPOINT_PATH):
+    """
+    取引ログをチャンク単位で読み込んで集計する
+    読み込み位置（バイトオフセット）と途中の集計をチェックポイントに保存し、中断後はその位置から再開する
+    """
+    stats = IngestStats()
+    source_key = os.path.abspath(source)
+    progress = checkpoint["files"].get(source_key)
+    started = time.perf_counter()
+
+    with open(source, "rb") as f:
+        header = f.readline()
+        offset = f.tell()
+        resumed_rows = 0
+        if progress:
+            offset = progress["offset"]
+            totals.update(progress["totals"])
+            main_days.update(progress.get("main_days", []))
+            print(f"[ingest] チェックポイントから再開します（{progress['rows']:,}行処理済み）")
+            resumed_rows = progress["rows"]
+        f.seek(offset)
+        start_offset = offset
+
+        chunk_count = 0
+        while True:
+            lines = []
+            for _ in range(chunk_rows):
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(line)
+            if not lines:
+                break
+
+            chunk = pd.read_csv(io.BytesIO(header + b"".join(lines)))
+            stats.skipped_rows += aggregate_chunk(chunk, totals, main_days, timestamp_col, tender_col, amount_col)
+            stats.rows += len(lines)
+            chunk_count += 1
+
+            if chunk_count % checkpoint_every == 0:
+                checkpoint["files"][source_key] = {
+                    "offset": f.tell(),
+                    "rows": resumed_rows + stats.rows,
+                    "totals": totals,
+                    "main_days": sorted(main_days),
+                }
+                save_checkpoint(checkpoint, checkpoint_path)
+                stats.bytes_read = f.tell() - start_offset
+                stats.seconds = time.perf_counter() - started
+                print(stats.format())
+
+        stats.bytes_read = f.tell() - start_offset
+        # 読み終えたログも、保存が終わるまでは再読み込みしないよう記録しておく
+        checkpoint["files"][source_key] = {
+            "offset": f.tell(),
+            "rows": resumed_rows + stats.rows,
+            "totals": totals,
+            "main_days": sorted(main_days),
+        }
+        save_checkpoint(checkpoint, checkpoint_path)
+
+    stats.seconds = time.perf_counter() - started
+    return stats
+
+
+def saved_totals(data, days):
+    """保存済みの売上データから、指定した日の項目ごとの金額を求める（支払方法の行は時間帯に含めない）"""
+    rows = data[data["日付"].astype(str).isin(set(days))]
+    payment = rows["支払方法"]
+    slots = pd.Series("dinner", index=rows.index).where(rows["時間帯"] != "昼営業", "lunch")
+    fields = payment.where(payment.isin(PAYMENT_FIELDS), slots)
+
+    totals = {day: dict.fromkeys(FIELDS, 0) for day in days}
+    grouped = rows["売上金額"].fillna(0).groupby([rows["日付"].astype(str), fields]).sum()
+    for (day, field), amount in grouped.items():
+        totals[day][field] += int(amount)
+    return totals
+
+
+def fold_sources(data, ledger, file_totals, main_days):
+    """
+    ログごとの集計を取り込み記録（ledger）に加え、取り込んだ日の売上を返す
+    営業日当日の取引を含む日は、記録されている全ログの合計で置き換える
+    翌朝の取引だけを含む日は、保存済みの売上にこのログの分を加える（同じログの前回分は差し引く）
+    削除・復元・手入力で書き直した日は記録から外れているため、古い記録で売上を作り直すことはない
+    """
+    days = sorted({day for totals in file_totals.values() for day in totals})
+    saved = saved_totals(data, days)
+    combined = {}
+    for day in days:
+        shares = ledger.setdefault(day, {})
+        if day in main_days:
+            for source, totals in file_totals.items():
+                if day in totals:
+                    shares[source] = totals[day]
+            day_totals = dict.fromkeys(FIELDS, 0)
+            for values in shares.values():
+                for field in FIELDS:
+                    day_totals[field] += values.get(field, 0)
+        else:
+            day_totals = saved[day]
+            for source, totals in file_totals.items():
+                if day not in totals:
+                    continue
+                previous = shares.get(source, {})
+                for field in FIELDS:
+                    day_totals[field] = max(day_totals[field] + totals[day][field] - previous.get(field, 0), 0)
+                shares[source] = totals[day]
+        combined[day] = day_totals
+    return combined
+
+
+def merge_totals(data, totals):
+    """集計結果で該当日の売上データを置き換える"""
+    records = []
+    for day in sorted(totals):
+        records.extend(build_sales_records(day, totals[day]))
+
+    ingested_days = set(totals)
+    data = data[~data["日付"].astype(str).isin(ingested_days)]
+    if records:
+        data = pd.concat([data, pd.DataFrame(records)], ignore_index=True)
+    return data.sort_values("日付", ignore_index=True)
+
+
+def ingest_files(sources, **options):
+    """
+    複数の取引ログをまとめて取り込み、売上データと日別集計に反映する
+    全ログの集計を合算してから反映するため、日付をまたぐ営業日の取引も失われない
+    """
+    checkpoint_path = options.get("checkpoint_path", CHECKPOINT_PATH)
+    checkpoint = load_checkpoint(checkpoint_path)
+    file_totals = {}
+    main_days = set()
+    all_stats = []
+    for source in sources:
+        totals = {}
+        all_stats.append(stream_log(source, totals, main_days, checkpoint, **options))
+        file_totals[os.path.abspath(source)] = totals
+
+    data = load_data()
+    ensure_baseline(data)
+    ledger = load_ingest_ledger()
+    totals = fold_sources(data, ledger, file_totals, main_days)
+    data = merge_totals(data, totals)
+    ingested_months = {day[:7] for day in totals}
+    if not save_data(data, ingested_months):
+        print("[ingest] 売上データの保存に失敗しました。チェックポイントは残しています。")
+        return all_stats
+
+    update_aggregates(data, ingested_months)
+    update_anomalies(ingested_months)
+    names = ", ".join(os.path.basename(source) for source in sources)
+    record_snapshot(data, ingested_months, reason=f"POS取り込み {names}")
+    refresh_forecasts()
+
+    # 取り込みが完了したログの記録を保存し、途中経過を消す
+    save_ingest_ledger(ledger)
+    for source in file_totals:
+        checkpoint["files"].pop(source, None)
+    save_checkpoint(checkpoint, checkpoint_path)
+    print(f"[ingest] {len(totals)}日分の売上を反映しました")
+    return all_stats
+
+
+def ingest_file(source, **options):
+    """取引ログを1つ取り込む"""
+    return ingest_files([source], **options)[0]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="POS取引ログの取り込み")
+    parser.add_argument("sources", nargs="+", help="取引ログ（CSV）")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="1チャンクの行数")
+    parser.add_argument("--checkpoint-every", type=int, default=10, help="チェックポイントを保存するチャンク間隔")
+    parser.add_argument("--timestamp-col", default="timestamp")
+    parser.add_argument("--tender-col", default="tender")
+    parser.add_argument("--amount-col", default="amount")
+    args = parser.parse_args(argv)
+
+    all_stats = ingest_files(
+        args.sources,
+        chunk_rows=args.chunk_rows,
+        checkpoint_every=args.checkpoint_every,
+        timestamp_col=args.timestamp_col,
+        tender_col=args.tender_col,
+        amount_col=args.amount_col,
+    )
+    for source, stats in zip(args.sources, all_stats):
+        print(f"{os.path.basename(source)}: {stats.format()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
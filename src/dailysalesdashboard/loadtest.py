@@ -0,0 +1,306 @@
+"""
+streamlit.testing.v1.AppTest を使った複数セッションの負荷試験
+外部通信なしで、合成データに対して売上入力・保存・ページ切替・期間変更を繰り返す
+    python -m dailysalesdashboard.loadtest --sessions 10 --years 3
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import update_aggregates
+from .anomaly import update_anomalies
+from .utils import build_sales_records, save_data
+
+DEFAULT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "run_app.py")
+
+
+@dataclass
+class LoadTestResult:
+    """負荷試験の計測結果"""
+    sessions: int
+    latencies: dict = field(default_factory=dict)
+    saves: int = 0
+    # 保存ごとの開始・終了時刻（time.time()、プロセス間で比較できる壁時計）
+    save_windows: list = field(default_factory=list)
+    memory_per_session: float = 0.0
+    session_keys: list = field(default_factory=list)
+    duration_seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    def record(self, step, seconds):
+        self.latencies.setdefault(step, []).append(seconds)
+
+    def merge(self, other):
+        """別プロセスで実行したセッションの結果を取り込む"""
+        for step, values in other.latencies.items():
+            self.latencies.setdefault(step, []).extend(values)
+        self.saves += other.saves
+        self.session_keys.extend(other.session_keys)
+        self.save_windows.extend(other.save_windows)
+        self.errors.extend(other.errors)
+
+    def summary(self):
+        """操作ごとのp50/p95/p99（ミリ秒）と全体の指標を返す"""
+        all_latencies = [v for values in self.latencies.values() for v in values]
+        steps = dict(self.latencies, 全体=all_latencies)
+        # 保存スループットは最初の保存開始から最後の保存終了までの経過時間で割る（並行した保存を重複して数えない）
+        save_span = (max(end for _, end in self.save_windows) - min(start for start, _ in self.save_windows)
+                     if self.save_windows else 0.0)
+        return {
+            "sessions": self.sessions,
+            "reruns": {
+                step: {
+                    "count": len(values),
+                    "p50_ms": float(np.percentile(values, 50) * 1000),
+                    "p95_ms": float(np.percentile(values, 95) * 1000),
+                    "p99_ms": float(np.percentile(values, 99) * 1000),
+                }
+                for step, values in steps.items() if values
+            },
+            "saves": self.saves,
+            "saves_per_sec": self.saves / save_span if save_span else 0.0,
+            "memory_per_session_kb": self.memory_per_session / 1024,
+            "session_keys": float(np.mean(self.session_keys)) if self.session_keys else 0.0,
+            "duration_seconds": self.duration_seconds,
+            "errors": self.errors,
+        }
+
+
+def generate_dataset(directory, years=3, seed=0):
+    """合成の売上データ（月ごとのパーティションと日別集計）を作成する"""
+    rng = np.random.default_rng(seed)
+    end = date.today().replace(day=1) - timedelta(days=1)
+    days = pd.date_range(end - timedelta(days=365 * years), end, freq="D")
+
+    records = []
+    for day in days:
+        weekday_factor = 1.3 if day.weekday() >= 4 else 1.0
+        values = {
+            "lunch": int(rng.normal(20000, 3000) * weekday_factor),
+            "dinner": int(rng.normal(55000, 8000) * weekday_factor),
+            "card": int(rng.normal(15000, 2000)),
+            "paypay": int(rng.normal(8000, 1500)),
+            "stella": int(rng.normal(3000, 800)),
+        }
+        records.extend(build_sales_records(day.strftime("%Y-%m-%d"), values))
+
+    data = pd.DataFrame(records)
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        save_data(data)
+        update_aggregates(data)
+        update_anomalies()
+    finally:
+        os.chdir(cwd)
+    return len(data)
+
+
+def _timed_run(at, result, step):
+    """1回の再実行を計測する"""
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    result.record(step, elapsed)
+    if at.exception:
+        result.errors.append(f"{step}: {at.exception[0].value}")
+    return elapsed
+
+
+ENTRY_LABELS = {"lunch": "昼営業", "dinner": "夜営業", "card": "カード", "paypay": "PayPay", "stella": "stella"}
+
+
+def _entry_input(at, field, day):
+    """売上入力画面の入力欄をラベルから探す"""
+    label = f"{ENTRY_LABELS[field]} {day}日"
+    return next(widget for widget in at.text_input if widget.label == label)
+
+
+def run_session(session_id, script, result, inputs_per_session, seed, month_switches=6):
+    """1セッション分の操作（売上入力→保存→月の切り替え→日別売上表→データ管理）を実行する"""
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + session_id)
+    at = AppTest.from_file(script, default_timeout=120)
+    _timed_run(at, result, "初回表示")
+
+    # 売上入力: 年月を選んで値を入力し保存
+    year = at.selectbox[0].options[-1]
+    month = rng.randint(1, 12)
+    at.selectbox[0].set_value(int(year))
+    at.selectbox[1].set_value(month)
+    _timed_run(at, result, "月切替")
+
+    for _ in range(inputs_per_session):
+        day = rng.randint(1, 28)
+        _entry_input(at, rng.choice(list(ENTRY_LABELS)), day).input(str(rng.randint(1000, 90000)))
+        _timed_run(at, result, "入力")
+
+    save_button = next((button for button in at.button if button.label == "保存"), None)
+    if save_button is None:
+        result.errors.append("保存: 保存ボタンが表示されていません")
+        return at
+    save_button.click()
+    save_started = time.time()
+    _timed_run(at, result, "保存")
+    result.save_windows.append((save_started, time.time()))
+    result.saves += 1
+
+    # 別の月に切り替えて入力し、最後に元の月へ戻る
+    for i in range(1, month_switches + 1):
+        at.selectbox[1].set_value((month + i - 1) % 12 + 1)
+        _timed_run(at, result, "月切替")
+        _entry_input(at, "lunch", rng.randint(1, 28)).input(str(rng.randint(1000, 90000)))
+        _timed_run(at, result, "入力")
+    at.selectbox[1].set_value(month)
+    _timed_run(at, result, "月切替")
+    result.session_keys.append(len(at.session_state))
+
+    # 日別売上表で月を変更
+    at.sidebar.radio[0].set_value("日別売上表")
+    _timed_run(at, result, "ページ切替")
+    at.selectbox[1].set_value(month)
+    _timed_run(at, result, "月切替")
+
+    # データ管理で期間を変更
+    at.sidebar.radio[0].set_value("データ管理")
+    _timed_run(at, result, "ページ切替")
+    if at.date_input:
+        end = date(int(year), month, 28)
+        at.date_input(key="data_start_date").set_value(end - timedelta(days=rng.choice([30, 180, 365])))
+        at.date_input(key="data_end_date").set_value(end)
+        _timed_run(at, result, "期間変更")
+
+    return at
+
+
+def _quiet_streamlit():
+    """ウィジェットの警告などでレポートが埋もれないようにStreamlitのログを抑える"""
+    from streamlit import logger
+    logger.set_log_level(logging.ERROR)
+
+
+def _session_worker(session_id, script, workdir, inputs_per_session, seed, month_switches):
+    """ワーカープロセスで1セッションを実行する（AppTestは同一プロセス内で並行実行できないため）"""
+    _quiet_streamlit()
+    os.chdir(workdir)
+    result = LoadTestResult(1)
+    try:
+        run_session(session_id, script, result, inputs_per_session, seed, month_switches)
+    except Exception as e:
+        result.errors.append(f"{type(e).__name__}: {e}")
+    return result
+
+
+def measure_session_memory(script, result, inputs_per_session, seed, sessions=3, month_switches=6):
+    """セッションを順番に実行し、保持したままのメモリ増加量からセッションあたりのメモリを求める"""
+    apps = []
+    tracemalloc.start()
+    try:
+        baseline, _ = tracemalloc.get_traced_memory()
+        for i in range(sessions):
+            apps.append(run_session(i, script, LoadTestResult(1), inputs_per_session, seed, month_switches))
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result.memory_per_session = (current - baseline) / max(len(apps), 1)
+
+
+def run_load_test(sessions=10, concurrency=None, years=3, inputs_per_session=5,
+                  script=DEFAULT_SCRIPT, seed=0, memory_sessions=3, month_switches=6):
+    """
+    N個のセッションを並行実行して計測する
+    各セッションは同じデータディレクトリを共有する別プロセスで実行し、保存時のファイル競合も再現する
+    """
+    script = os.path.abspath(script)
+    result = LoadTestResult(sessions)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        generate_dataset(workdir, years=years, seed=seed)
+
+        started = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=concurrency or sessions, mp_context=context) as pool:
+            futures = [pool.submit(_session_worker, i, script, workdir, inputs_per_session, seed, month_switches)
+                       for i in range(sessions)]
+            for future in futures:
+                try:
+                    result.merge(future.result())
+                except Exception as e:
+                    result.errors.append(f"{type(e).__name__}: {e}")
+        result.duration_seconds = time.perf_counter() - started
+
+        # メモリはtracemallocの影響がレイテンシに出ないよう、並行実行とは別に計測する
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            if memory_sessions:
+                measure_session_memory(script, result, inputs_per_session, seed, memory_sessions, month_switches)
+        finally:
+            os.chdir(cwd)
+
+    return result
+
+
+def format_report(summary):
+    """計測結果を表形式の文字列にする"""
+    lines = [f"セッション数: {summary['sessions']}  所要時間: {summary['duration_seconds']:.1f}s"]
+    lines.append(f"{'操作':<8}{'回数':>6}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for step, stats in summary["reruns"].items():
+        lines.append(f"{step:<8}{stats['count']:>6}{stats['p50_ms']:>10.1f}"
+                     f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    lines.append(f"保存スループット: {summary['saves_per_sec']:.2f}件/s（{summary['saves']}件）")
+    lines.append(f"セッションあたりメモリ: {summary['memory_per_session_kb']:,.0f}KB"
+                 f"（セッション状態のキー数: {summary['session_keys']:,.0f}）")
+    if summary["errors"]:
+        lines.append(f"エラー: {len(summary['errors'])}件")
+        lines.extend(f"  {error}" for error in summary["errors"][:10])
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="複数セッションの負荷試験")
+    parser.add_argument("--sessions", type=int, default=10, help="セッション数")
+    parser.add_argument("--concurrency", type=int, help="同時実行数（省略時はセッション数）")
+    parser.add_argument("--years", type=int, default=3, help="合成データの年数")
+    parser.add_argument("--inputs", type=int, default=5, help="1セッションあたりの入力回数")
+    parser.add_argument("--script", default=DEFAULT_SCRIPT, help="アプリのスクリプト")
+    parser.add_argument("--memory-sessions", type=int, default=3, help="メモリ計測に使うセッション数（0で計測しない）")
+    parser.add_argument("--month-switches", type=int, default=6, help="保存後に売上入力で切り替える月数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    args = parser.parse_args(argv)
+
+    _quiet_streamlit()
+    result = run_load_test(
+        sessions=args.sessions,
+        concurrency=args.concurrency,
+        years=args.years,
+        inputs_per_session=args.inputs,
+        script=args.script,
+        seed=args.seed,
+        memory_sessions=args.memory_sessions,
+        month_switches=args.month_switches,
+    )
+    summary = result.summary()
+    print(format_report(summary))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -11,7 +11,7 @@ import os
 # utils.pyからの機能インポート
 # このファイルが存在しない場合は作成する必要があります
 try:
-    from .utils import load_data, save_data, validate_sales_data
+    from .utils import load_data, save_data, delete_range, validate_sales_data, build_sales_records, forget_ingested
 except ImportError:
     # utils.pyがない場合のフォールバック関数
     def load_data():
@@ -27,7 +27,7 @@ except ImportError:
             st.error(f"データ読み込みエラー: {e}")
             return pd.DataFrame(columns=["日付", "時間帯", "支払方法", "売上金額", "備考"])
     
-    def save_data(df):
+    def save_data(df, months=None):
         """データを保存する関数"""
         try:
             df.to_csv("sales_data.csv", index=False)
@@ -40,6 +40,33 @@ except ImportError:
         """売上データの検証を行う関数"""
         return True
 
+    def delete_range(df, start_date, end_date):
+        """指定期間のデータを削除して保存する関数"""
+        dates = df["日付"].astype(str)
+        data = df.loc[(dates < str(start_date)) | (dates > str(end_date))].reset_index(drop=True)
+        months = list(pd.period_range(start_date, end_date, freq="M").strftime("%Y-%m"))
+        return data, months, save_data(data)
+
+    def forget_ingested(start_date, end_date):
+        """POSログの取り込み記録がない場合は何もしない"""
+
+    def build_sales_records(date_str, values):
+        """1日分の売上を保存用のレコードに変換する関数"""
+        return [{
+            "日付": date_str,
+            "時間帯": "昼営業" if payment_type == "lunch" else "夜営業",
+            "支払方法": payment_type,
+            "売上金額": amount,
+            "備考": ""
+        } for payment_type, amount in values.items() if amount > 0]
+
+from .aggregates import update_aggregates, ensure_aggregates, month_key
+from .anomaly import update_anomalies, load_anomalies, month_baselines, anomaly_message, format_flags
+from .snapshots import ensure_baseline, record_snapshot, list_snapshots, restore_and_save, format_snapshot
+from .table import render_paginated_table, load_table_source, table_version, date_window, export_csv
+from .forecast import forecast_path, dataset_version, load_forecasts, lookup_forecast, schedule_refresh
+from .session import EntrySession
+
 # 既存データを標準化する関数を追加
 def standardize_data(df):
     """CSVデータを標準化して一貫性を確保する"""
@@ -62,13 +89,12 @@ def standardize_data(df):
     
     return df
 
-# 入力値の検証用関数
-def validate_input(value, key):
+# 入力値の検証用関数（数値とエラーメッセージを返す）
+def validate_input(value):
     try:
         # 空文字列は0として扱う
         if value.strip() == "":
-            st.session_state[f'error_{key}'] = ""
-            return 0
+            return 0, ""
 
         # 全角数字を半角数字に変換
         value = value.translate(str.maketrans('０１２３４５６７８９，．', '0123456789,.'))
@@ -76,21 +102,16 @@ def validate_input(value, key):
         # 数値以外の文字が含まれているかチェック
         cleaned_value = value.replace(',', '')
         if not cleaned_value.replace('.', '').isdigit():
-            st.session_state[f'error_{key}'] = "売上金額は数値で入力してください"
-            return 0
+            return 0, "売上金額は数値で入力してください"
 
         # カンマを除去して数値変換（小数点以下を切り捨て）
         num = int(float(cleaned_value))
         if num < 0:
-            st.session_state[f'error_{key}'] = "売上金額は0以上の数値を入力してください"
-            return 0
+            return 0, "売上金額は0以上の数値を入力してください"
 
-        # 正しい値が入力された場合、エラーメッセージをクリア
-        st.session_state[f'error_{key}'] = ""
-        return num
+        return num, ""
     except ValueError:
-        st.session_state[f'error_{key}'] = "売上金額は数値で入力してください"
-        return 0
+        return 0, "売上金額は数値で入力してください"
 
 def save_sales_data(selected_year, selected_month, sales_data, last_day):
     """売上データを保存する共通関数"""
@@ -99,18 +120,12 @@ def save_sales_data(selected_year, selected_month, sales_data, last_day):
         new_records = []
         for day, values in sales_data.items():
             date_str = f"{selected_year}-{selected_month:02d}-{day:02d}"
-
-            for payment_type, amount in values.items():
-                if amount > 0:
-                    new_records.append({
-                        "日付": date_str,
-                        "時間帯": "昼営業" if payment_type == "lunch" else "夜営業",
-                        "支払方法": payment_type,
-                        "売上金額": amount,
-                        "備考": ""
-                    })
+            new_records.extend(build_sales_records(date_str, values))
 
         if new_records:
+            # 上書き前の状態をスナップショットとして残す
+            ensure_baseline(st.session_state.data)
+
             # 選択された月のデータを削除
             month_start = f"{selected_year}-{selected_month:02d}-01"
             month_end = f"{selected_year}-{selected_month:02d}-{last_day:02d}"
@@ -124,30 +139,81 @@ def save_sales_data(selected_year, selected_month, sales_data, last_day):
             new_df = pd.DataFrame(new_records)
             st.session_state.data = pd.concat([st.session_state.data, new_df], ignore_index=True)
 
-            # データを保存
-            return save_data(st.session_state.data)
+            # 選択月のパーティションだけを保存し、保存した月の日別集計を更新
+            saved_months = [month_key(selected_year, selected_month)]
+            if save_data(st.session_state.data, saved_months):
+                forget_ingested(month_start, month_end)
+                update_aggregates(st.session_state.data, saved_months)
+                update_anomalies(saved_months)
+                schedule_refresh()
+                record_snapshot(st.session_state.data, saved_months,
+                                reason=f"売上入力 {selected_year}年{selected_month}月")
+                return True
+            return False
     except Exception as e:
         print(f"データ保存エラー: {e}")
         return False
 
+@st.cache_data(show_spinner=False, max_entries=12)
+def _cached_baselines(version, year, month):
+    """売上入力画面の基準値を日別集計のバージョン（更新時刻）と年月ごとにキャッシュする"""
+    return month_baselines(load_table_source(version), year, month)
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _cached_forecasts(mtime):
+    """予測ファイルを更新時刻ごとにキャッシュする"""
+    return load_forecasts()
+
+def get_forecasts():
+    """保存済みの予測を返す（日別集計より古い場合はバックグラウンドで計算し直す）"""
+    try:
+        mtime = os.path.getmtime(forecast_path())
+    except OSError:
+        mtime = None
+    cached = _cached_forecasts(mtime)
+    if cached.get("version") != dataset_version():
+        schedule_refresh()
+    return cached["forecasts"]
+
+def show_forecast(selected_year, selected_month):
+    """時間帯別の月末着地見込みと翌月予測を表示する"""
+    forecast = lookup_forecast(get_forecasts(), selected_year, selected_month)
+    if forecast is None:
+        return
+
+    rows = [("月末着地見込み" if forecast["next_month"] is not None else "当月予測", forecast["month_end"])]
+    if forecast["next_month"] is not None:
+        rows.append(("翌月予測", forecast["next_month"]))
+
+    for label, values in rows:
+        lunch = values.get("lunch", 0)
+        dinner = values.get("dinner", 0)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric(f"{label}（昼営業）", f"¥{lunch:,.0f}")
+        with col2:
+            st.metric(f"{label}（夜営業）", f"¥{dinner:,.0f}")
+        with col3:
+            st.metric(f"{label}（合計）", f"¥{lunch + dinner:,.0f}")
+    st.caption(f"{forecast['as_of']}までの売上から曜日とトレンドを考慮して予測しています。")
+
 # 入力値変更時のコールバック関数
-def on_value_change(key):
+def on_value_change(year, month, day, field):
     """
-    入力値の検証のみを行う関数
+    入力値を検証し、その月の入力状態に反映する
     """
+    entry = st.session_state.entry.lookup(year, month)
+    if entry is None:
+        return
+
     # 値を検証
-    value = st.session_state[key]
-    validated_value = validate_input(value, key)
+    key = entry.widget_key(day, field)
+    validated_value, _ = validate_input(st.session_state[key])
     st.session_state[key] = str(validated_value)
 
-    # キーから日付と種類を抽出
-    payment_type, day = key.split('_')
-    day = int(day)
-
-    # セッション状態のsales_dataを更新
-    if day not in st.session_state.sales_data:
-        st.session_state.sales_data[day] = {}
-    st.session_state.sales_data[day][payment_type] = validated_value
+    # 入力状態を更新（未保存の入力として月の切り替え後も保持する）
+    entry.set_value(day, field, validated_value)
+    entry.edited = True
 
 # メイン関数
 def main():
@@ -159,9 +225,11 @@ def main():
     )
 
     # セッション状態の初期化チェック
-    if 'previous_year_month' not in st.session_state:
-        st.session_state.previous_year_month = ""
+    if 'entry' not in st.session_state:
+        st.session_state.entry = EntrySession()
 
+    # 日別集計がまだない場合（既存のsales_data.csvのみの環境）は作成する
+    ensure_aggregates(st.session_state.data)
 
     # CSSスタイルの追加（ファイルがない場合はインラインで定義）
     try:
@@ -236,35 +304,16 @@ def main():
                 index=datetime.now().month - 1
             )
 
-        # 年月が変更されたかチェック
-        current_year_month = f"{selected_year}-{selected_month}"
-        if st.session_state.previous_year_month != current_year_month:
-            # セッション状態の完全なリセット
-            st.session_state.sales_data = {}
+        # 選択月の入力状態（入力欄のキーは年月ごとに分かれているため、月を切り替えてもキーの削除は不要）
+        entry, switched = st.session_state.entry.activate(selected_year, selected_month, st.session_state.data)
+        if switched:
             st.session_state.form_submitted = False
-            st.session_state.previous_value = {}
-
-            # 入力フィールドの状態を完全にリセット
-            keys_to_delete = []
-            for key in st.session_state.keys():
-                if any(prefix in key for prefix in ['lunch_', 'dinner_', 'card_', 'paypay_', 'stella_', 'error_']):
-                    keys_to_delete.append(key)
-
-            for key in keys_to_delete:
-                del st.session_state[key]
-
-            st.session_state.previous_year_month = current_year_month
 
         # 選択された月の日数を取得
-        _, last_day = calendar.monthrange(selected_year, selected_month)
+        last_day = entry.last_day
 
-        # 既存データの取得（月初から月末までの範囲で）
-        month_start = f"{selected_year}-{selected_month:02d}-01"
-        month_end = f"{selected_year}-{selected_month:02d}-{last_day:02d}"
-        existing_month_data = st.session_state.data[
-            (st.session_state.data['日付'] >= month_start) &
-            (st.session_state.data['日付'] <= month_end)
-        ].copy()
+        # 異常値チェック用の曜日別基準値
+        baselines = _cached_baselines(table_version(), selected_year, selected_month)
 
         # 表形式での入力フォーム
         col_labels = st.columns([1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1])
@@ -278,47 +327,8 @@ def main():
 
         # 売上データの入力
         has_error = False
-        total_lunch = 0
-        total_dinner = 0
-        total_card = 0
-        total_paypay = 0
-        total_stella = 0
 
         for day in range(1, last_day + 1):
-            date_str = f"{selected_year}-{selected_month:02d}-{day:02d}"
-
-            # 既存データの取得
-            existing_data = existing_month_data[
-                existing_month_data['日付'] == date_str
-            ]
-
-            # 初期値の設定（すべて空に）
-            values = {
-                'lunch': 0,
-                'dinner': 0,
-                'card': 0,
-                'paypay': 0,
-                'stella': 0
-            }
-
-            # 既存データがある場合のみ値を設定
-            if not existing_data.empty:
-                # 時間帯での売上集計
-                lunch_data = existing_data[existing_data['時間帯'] == '昼営業']
-                dinner_data = existing_data[existing_data['時間帯'] == '夜営業']
-
-                if not lunch_data.empty:
-                    values['lunch'] = lunch_data['売上金額'].sum()
-                if not dinner_data.empty:
-                    values['dinner'] = dinner_data['売上金額'].sum()
-
-                # 支払方法での売上集計
-                if '支払方法' in existing_data.columns:
-                    for payment_type in ['card', 'paypay', 'stella']:
-                        payment_data = existing_data[existing_data['支払方法'] == payment_type]
-                        if not payment_data.empty:
-                            values[payment_type] = payment_data['売上金額'].sum()
-
             cols = st.columns([1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1])
             cols[0].write(f"{day}日")
 
@@ -331,55 +341,42 @@ def main():
                 ('paypay', 'PayPay'),
                 ('stella', 'stella')
             ]):
-                input_key = f"{key}_{day}"
-
-                # エラー状態の初期化
-                if f'error_{input_key}' not in st.session_state:
-                    st.session_state[f'error_{input_key}'] = ""
-
-                # 入力フィールドを初期化
-                if input_key not in st.session_state:
-                    # 既存データがある場合はその値を設定、ない場合は空文字列
-                    if values[key] > 0:
-                        st.session_state[input_key] = str(int(values[key]))
-                    else:
-                        st.session_state[input_key] = ""
-
-                # 入力フィールドの表示
+                # 入力フィールドの表示（初期値はentry.activateで設定済み）
                 sales_str = cols[i + 1].text_input(
                     f"{label} {day}日",
-                    key=input_key,
-                    value=st.session_state[input_key],  # セッション状態から値を取得
+                    key=entry.widget_key(day, key),
                     label_visibility="collapsed",
                     help="",
                     autocomplete="off",
                     on_change=on_value_change,
-                    args=(input_key,)
+                    args=(selected_year, selected_month, day, key)
                 )
 
-                # 検証済みの値を使用
-                sales_values[key] = validate_input(sales_str, input_key)
+                # 検証済みの値を入力状態に反映
+                sales_values[key], error = validate_input(sales_str)
+                entry.set_value(day, key, sales_values[key])
 
                 # エラー表示
-                if st.session_state[f'error_{input_key}']:
-                    cols[i + 1].error(st.session_state[f'error_{input_key}'])
+                if error:
+                    cols[i + 1].error(error)
                     has_error = True
+                # 通常の売上から大きく外れた値の警告（保存は可能）
+                elif key in ('lunch', 'dinner'):
+                    warning = anomaly_message(sales_values[key], key, baselines[day].get(key))
+                    if warning:
+                        cols[i + 1].warning(warning)
 
             # 合計の計算と表示（昼営業と夜営業のみ）
             daily_total = sales_values['lunch'] + sales_values['dinner']
             cols[6].write(f"¥{daily_total:,.0f}")
 
-            # 合計に加算
-            total_lunch += sales_values['lunch']
-            total_dinner += sales_values['dinner']
-            total_card += sales_values['card']
-            total_paypay += sales_values['paypay']
-            total_stella += sales_values['stella']
-
-            # セッション状態に保存
-            st.session_state.sales_data[day] = sales_values
-
         # 月間合計の表示
+        totals = entry.totals()
+        total_lunch = totals['lunch']
+        total_dinner = totals['dinner']
+        total_card = totals['card']
+        total_paypay = totals['paypay']
+        total_stella = totals['stella']
         st.divider()
         total_cols = st.columns([1.5, 1.5, 1.5, 1.5, 1.5, 1.5, 1])
         total_cols[0].write("**月間合計**")
@@ -390,6 +387,9 @@ def main():
         total_cols[5].write(f"**¥{total_stella:,.0f}**")
         total_cols[6].write(f"**¥{total_lunch + total_dinner:,.0f}**")  # 昼営業と夜営業のみの合計
 
+        # 月末着地見込み（保存済みのデータから一括計算した予測）
+        show_forecast(selected_year, selected_month)
+
         # 保存ボタン（フォーム内）
         with st.form("sales_form"):
             submitted = st.form_submit_button("保存", use_container_width=True)
@@ -397,8 +397,9 @@ def main():
                 if has_error:
                     st.error("入力エラーがあります。修正してください。")
                 else:
-                    save_success = save_sales_data(selected_year, selected_month, st.session_state.sales_data, last_day)
+                    save_success = save_sales_data(selected_year, selected_month, entry.sales_data(), last_day)
                     if save_success:
+                        entry.edited = False
                         st.success("売上データを保存しました！")
                         st.session_state.form_submitted = False
                         # 日別売上表に画面遷移
@@ -422,25 +423,20 @@ def main():
             year_start = f"{selected_year}-01-01"
             year_end = f"{selected_year}-12-31"
 
-            year_data = st.session_state.data[
-                (st.session_state.data['日付'] >= year_start) &
-                (st.session_state.data['日付'] <= year_end)
-            ].copy()  # コピーを作成
+            # 日別集計から年の行を取得（夜営業は日別売上表と同じく支払方法の行を含まない）
+            agg = load_table_source()
+            lo, hi = date_window(agg, year_start, year_end)
+            year_agg = agg.iloc[lo:hi]
 
-            if not year_data.empty:
+            if not year_agg.empty:
                 # 月別データの集計
-                year_data['月'] = pd.to_datetime(year_data['日付']).dt.month
-                monthly_data = year_data.groupby(['月', '時間帯'])['売上金額'].sum().reset_index()
-
-                # 時間帯別のデータフレームを作成
-                lunch_data = monthly_data[monthly_data['時間帯'] == '昼営業'].set_index('月')['売上金額']
-                dinner_data = monthly_data[monthly_data['時間帯'] == '夜営業'].set_index('月')['売上金額']
+                months = year_agg['日付'].str[5:7].astype(int).rename('月')
 
                 # 月別サマリーの作成
                 monthly_summary = pd.DataFrame({
-                    '昼営業': lunch_data,
-                    '夜営業': dinner_data
-                }).fillna(0)
+                    '昼営業': year_agg['lunch'].groupby(months).sum(),
+                    '夜営業': year_agg['dinner'].groupby(months).sum()
+                })
 
                 # 総売上列を追加
                 monthly_summary['総売上'] = monthly_summary['昼営業'] + monthly_summary['夜営業']
@@ -541,15 +537,15 @@ def main():
             end_date = st.date_input("終了日", datetime.now())
 
         if not st.session_state.data.empty:
-            # データのフィルタリング
-            mask = (pd.to_datetime(st.session_state.data['日付']) >= pd.to_datetime(start_date)) & \
-                   (pd.to_datetime(st.session_state.data['日付']) <= pd.to_datetime(end_date))
-            filtered_data = st.session_state.data[mask].copy()  # コピーを作成
+            # 日別集計から期間の行を取得（夜営業は日別売上表と同じく支払方法の行を含まない）
+            agg = load_table_source()
+            lo, hi = date_window(agg, start_date, end_date)
+            period_agg = agg.iloc[lo:hi].rename(columns={'lunch': '昼営業', 'dinner': '夜営業'})
 
-            if not filtered_data.empty:
+            if not period_agg.empty:
                 # 集計データの表示
-                lunch_total = filtered_data[filtered_data['時間帯'] == '昼営業']['売上金額'].sum()
-                dinner_total = filtered_data[filtered_data['時間帯'] == '夜営業']['売上金額'].sum()
+                lunch_total = period_agg['昼営業'].sum()
+                dinner_total = period_agg['夜営業'].sum()
                 total_sales = lunch_total + dinner_total
 
                 col1, col2, col3 = st.columns(3)
@@ -565,7 +561,8 @@ def main():
 
                 with tab1:
                     # 日次売上推移グラフ（時間帯別）
-                    daily_sales = filtered_data.groupby(['日付', '時間帯'])['売上金額'].sum().reset_index()
+                    daily_sales = period_agg.melt(id_vars='日付', value_vars=['昼営業', '夜営業'],
+                                                  var_name='時間帯', value_name='売上金額')
                     fig = px.bar(daily_sales, x='日付', y='売上金額', color='時間帯',
                                 title="日次売上推移（時間帯別）",
                                 labels={'売上金額': '売上金額（円）'},
@@ -574,7 +571,7 @@ def main():
 
                 with tab2:
                     # 時間帯別売上構成
-                    time_sales = filtered_data.groupby('時間帯')['売上金額'].sum()
+                    time_sales = pd.Series({'昼営業': lunch_total, '夜営業': dinner_total})
                     fig = px.pie(values=time_sales.values,
                                 names=time_sales.index,
                                 title="時間帯別売上構成")
@@ -612,9 +609,14 @@ def main():
             ].copy()  # コピーを作成
 
             if not month_data.empty:
+                # 日別集計から月の行を取得（夜営業は予測や異常検知と同じく支払方法の行を含まない）
+                agg = load_table_source()
+                lo, hi = date_window(agg, month_start, month_end)
+                month_agg = agg.iloc[lo:hi]
+
                 # 集計データを表示
-                lunch_total = month_data[month_data['時間帯'] == '昼営業']['売上金額'].sum()
-                dinner_total = month_data[month_data['時間帯'] == '夜営業']['売上金額'].sum()
+                lunch_total = month_agg['lunch'].sum()
+                dinner_total = month_agg['dinner'].sum()
                 total = lunch_total + dinner_total
 
                 col1, col2, col3 = st.columns(3)
@@ -625,22 +627,15 @@ def main():
                 with col3:
                     st.metric("月間総売上", f"¥{total:,.0f}")
 
-                try:
-                    # 日付ごとのデータを準備
-                    daily_data = month_data.groupby(['日付', '時間帯'])['売上金額'].sum().reset_index()
-
-                    # 時間帯別のデータフレームを作成
-                    lunch_data = daily_data[daily_data['時間帯'] == '昼営業'].set_index('日付')['売上金額']
-                    dinner_data = daily_data[daily_data['時間帯'] == '夜営業'].set_index('日付')['売上金額']
+                show_forecast(selected_year, selected_month)
 
+                try:
                     # 日別サマリーの作成
                     daily_summary = pd.DataFrame({
-                        '昼営業': lunch_data,
-                        '夜営業': dinner_data
-                    }).fillna(0)
-
-                    # インデックスをリセットして日付列を追加
-                    daily_summary = daily_summary.reset_index()
+                        '日付': month_agg['日付'].to_numpy(),
+                        '昼営業': month_agg['lunch'].to_numpy(),
+                        '夜営業': month_agg['dinner'].to_numpy()
+                    })
 
                     # 総売上列を追加
                     daily_summary['総売上'] = daily_summary['昼営業'] + daily_summary['夜営業']
@@ -648,6 +643,11 @@ def main():
                     # データを日付でソート（過去から未来）
                     daily_summary = daily_summary.sort_values('日付', ascending=True)
 
+                    # 異常検知の警告を追加
+                    flags = load_anomalies()
+                    flags = flags[(flags['日付'] >= month_start) & (flags['日付'] <= month_end)]
+                    daily_summary['警告'] = daily_summary['日付'].map(format_flags(flags)).fillna("")
+
                     # 表示用にフォーマット
                     formatted_summary = daily_summary.copy()
                     for col in ['昼営業', '夜営業', '総売上']:
@@ -658,7 +658,8 @@ def main():
                         '日付': '合計',
                         '昼営業': f"¥{daily_summary['昼営業'].sum():,.0f}",
                         '夜営業': f"¥{daily_summary['夜営業'].sum():,.0f}",
-                        '総売上': f"¥{daily_summary['総売上'].sum():,.0f}"
+                        '総売上': f"¥{daily_summary['総売上'].sum():,.0f}",
+                        '警告': ""
                     }])
                     formatted_summary = pd.concat([formatted_summary, total_row])
 
@@ -690,86 +691,21 @@ def main():
                                        datetime.now(),
                                        key="data_end_date")
 
-            # データのフィルタリング
-            mask = (pd.to_datetime(st.session_state.data['日付']) >= pd.to_datetime(start_date)) & \
-                   (pd.to_datetime(st.session_state.data['日付']) <= pd.to_datetime(end_date))
-            filtered_data = st.session_state.data[mask].copy()
+            # 日別集計から期間内の行を求める（日付でソート済みのため二分探索で絞り込む）
+            version = table_version()
+            daily_totals = load_table_source(version)
+            window_start, window_end = date_window(daily_totals, start_date, end_date)
 
-            if not filtered_data.empty:
-                # データテーブル表示
+            if window_end > window_start:
+                # データテーブル表示（表示中のページのみ書式化）
                 st.subheader("売上データ一覧")
-
-                # データの表示用にコピーを作成
-                display_data = filtered_data.copy()
-
-                # 日付でソート
-                display_data = display_data.sort_values('日付', ascending=False)
-
-                # 日付ごとの各種売上を集計
-                pivoted_data = pd.pivot_table(
-                    display_data,
-                    index=['日付'],
-                    columns=['時間帯'],
-                    values='売上金額',
-                    aggfunc='sum',
-                    fill_value=0
-                ).reset_index()
-
-                # 必要な列を作成
-                result_data = pd.DataFrame()
-                result_data['日付'] = pivoted_data['日付']
-                
-                # 昼営業と夜営業の列があるか確認
-                if '昼営業' in pivoted_data.columns:
-                    result_data['昼営業'] = pivoted_data['昼営業'].astype(int)
-                else:
-                    result_data['昼営業'] = 0
-                    
-                if '夜営業' in pivoted_data.columns:
-                    result_data['夜営業'] = pivoted_data['夜営業'].astype(int)
-                else:
-                    result_data['夜営業'] = 0
-
-                # 支払方法ごとの売上を集計（可能な場合）
-                if '支払方法' in display_data.columns:
-                    for payment_type in ['card', 'paypay', 'stella']:
-                        payment_data = display_data[display_data['支払方法'] == payment_type]
-                        if not payment_data.empty:
-                            # 日付ごとに集計
-                            payment_by_date = payment_data.groupby('日付')['売上金額'].sum()
-                            # 結果に追加
-                            for date, amount in payment_by_date.items():
-                                if date in result_data['日付'].values:
-                                    idx = result_data[result_data['日付'] == date].index[0]
-                                    result_data.loc[idx, payment_type.capitalize() if payment_type != 'stella' else 'stella'] = amount
-                
-                # 存在しない列には0を設定
-                for col in ['カード', 'PayPay', 'stella']:
-                    if col not in result_data.columns:
-                        result_data[col] = 0
-
-                # 表示用にデータをフォーマット
-                formatted_data = result_data.style.format({
-                    "昼営業": "¥{:,.0f}",
-                    "夜営業": "¥{:,.0f}",
-                    "カード": "¥{:,.0f}",
-                    "PayPay": "¥{:,.0f}",
-                    "stella": "¥{:,.0f}"
-                })
-
-                # データテーブルの表示
-                st.dataframe(
-                    formatted_data,
-                    use_container_width=True,
-                    hide_index=True
-                )
+                render_paginated_table(daily_totals, start_date, end_date, key="data_table")
 
                 # CSVエクスポート（直接ダウンロード）
                 st.divider()
-                csv = result_data.to_csv(index=False)
                 st.download_button(
                     label="CSVエクスポート",
-                    data=csv,
+                    data=export_csv(version, window_start, window_end),
                     file_name=f"sales_data_{datetime.now().strftime('%Y%m%d')}.csv",
                     mime="text/csv",
                     use_container_width=True
@@ -780,17 +716,20 @@ def main():
                 st.subheader("データ管理操作")
                 
                 with st.expander("選択期間のデータを削除"):
-                    st.warning("⚠️ 選択した期間のデータをすべて削除します。この操作は元に戻せません。")
+                    st.warning("⚠️ 選択した期間のデータをすべて削除します。削除前の状態は「スナップショットから復元」で戻せます。")
                     
                     if st.button("選択期間のデータを削除", key="delete_data_button"):
-                        # 選択期間以外のデータを保持
-                        mask = ~((pd.to_datetime(st.session_state.data['日付']) >= pd.to_datetime(start_date)) & 
-                                (pd.to_datetime(st.session_state.data['日付']) <= pd.to_datetime(end_date)))
-                        st.session_state.data = st.session_state.data.loc[mask].copy()
-                        
-                        # データを保存
-                        save_success = save_data(st.session_state.data)
+                        ensure_baseline(st.session_state.data)
+
+                        # 月全体はパーティションごと削除し、月の一部はトゥームストーンで削除する
+                        st.session_state.data, deleted_months, save_success = delete_range(
+                            st.session_state.data, start_date, end_date)
                         if save_success:
+                            update_aggregates(st.session_state.data, deleted_months)
+                            update_anomalies(deleted_months)
+                            schedule_refresh()
+                            record_snapshot(st.session_state.data, deleted_months,
+                                            reason=f"期間削除 {start_date}〜{end_date}")
                             st.success("選択期間のデータを削除しました。")
                             st.rerun()
                         else:
@@ -799,11 +738,16 @@ def main():
                 with st.expander("データ構造を修復"):
                     st.info("データの構造に問題がある場合に修復を実行します。")
                     if st.button("データ修復を実行"):
+                        ensure_baseline(st.session_state.data)
                         # データを標準化
                         st.session_state.data = standardize_data(st.session_state.data)
                         # 修復したデータを保存
                         save_success = save_data(st.session_state.data)
                         if save_success:
+                            update_aggregates(st.session_state.data)
+                            update_anomalies()
+                            schedule_refresh()
+                            record_snapshot(st.session_state.data, reason="データ修復")
                             st.success("データ構造の修復が完了しました。")
                             st.rerun()
                         else:
@@ -812,4 +756,26 @@ def main():
                 st.info("選択された期間のデータがありません。")
         else:
             st.info("登録されているデータがありません。")
-    
\ No newline at end of file
+
+        # スナップショットからの復元（データが空になった場合も表示する）
+        snapshots = list_snapshots()
+        if snapshots:
+            with st.expander("スナップショットから復元"):
+                st.info("選択した時点の状態に戻します。変更のあった月だけが置き換えられます。")
+                selected_snapshot = st.selectbox(
+                    "復元する時点",
+                    snapshots,
+                    format_func=format_snapshot,
+                    key="restore_snapshot"
+                )
+                if st.button("この時点に復元", key="restore_snapshot_button"):
+                    data, changed, save_success = restore_and_save(st.session_state.data, selected_snapshot["id"])
+                    if not save_success:
+                        st.error("データ復元中にエラーが発生しました。")
+                    elif changed:
+                        st.session_state.data = data
+                        schedule_refresh()
+                        st.success(f"{len(changed)}か月分のデータを復元しました。")
+                        st.rerun()
+                    else:
+                        st.info("現在のデータと同じ状態です。")
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+# SMS1通あたりの最大文字数（Twilioの上限）
+SMS_MAX_LENGTH = 1600
+
+
+@dataclass
+class SMSMessage:
+    """送信するSMS"""
+    to: str
+    body: str
+
+
+@dataclass
+class SendResult:
+    """SMSの送信結果"""
+    to: str
+    ok: bool
+    error: str = ""
+
+
+class Notifier(ABC):
+    """通知送信の基底クラス（送信方法ごとにsendを実装する）"""
+
+    @abstractmethod
+    async def send(self, message):
+        """1通を送信し、SendResultを返す"""
+
+
+class TwilioSMSNotifier(Notifier):
+    """TwilioでSMSを送信する"""
+
+    def __init__(self, account_sid, auth_token, from_number):
+        from twilio.rest import Client
+        self.client = Client(account_sid, auth_token)
+        self.from_number = from_number
+
+    @classmethod
+    def from_env(cls):
+        """環境変数から認証情報を読み込んで作成する"""
+        return cls(
+            os.environ["TWILIO_ACCOUNT_SID"],
+            os.environ["TWILIO_AUTH_TOKEN"],
+            os.environ["TWILIO_FROM_NUMBER"],
+        )
+
+    async def send(self, message):
+        try:
+            # Twilioクライアントは同期APIのためスレッドで実行する
+            await asyncio.to_thread(
+                self.client.messages.create,
+                to=message.to,
+                from_=self.from_number,
+                body=message.body,
+            )
+            return SendResult(message.to, True)
+        except Exception as e:
+            return SendResult(message.to, False, str(e))
+
+
+class FakeNotifier(Notifier):
+    """送信せずに内容を記録するローカル用の通知（テスト・動作確認用）"""
+
+    def __init__(self, latency=0.0, fail_numbers=(), echo=False):
+        self.latency = latency
+        self.fail_numbers = set(fail_numbers)
+        self.echo = echo
+        self.sent = []
+
+    async def send(self, message):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if message.to in self.fail_numbers:
+            return SendResult(message.to, False, "送信失敗（テスト）")
+        self.sent.append(message)
+        if self.echo:
+            print(f"--- SMS to {message.to} ---\n{message.body}")
+        return SendResult(message.to, True)
+
+
+class RateLimiter:
+    """一定間隔でしか送信できないようにする単純なレート制限"""
+
+    def __init__(self, rate_per_sec):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec > 0 else 0.0
+        self._next_time = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            wait = self._next_time - loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._next_time = max(loop.time(), self._next_time) + self.interval
+
+
+def split_body(body, max_length=SMS_MAX_LENGTH):
+    """長い本文を行単位でSMSの上限文字数以下に分割する"""
+    parts = []
+    current = ""
+    for line in body.split("\n"):
+        candidate = f"{current}\n{line}" if current else line
+        if len(candidate) > max_length and current:
+            parts.append(current)
+            current = line[:max_length]
+        else:
+            current = candidate[:max_length]
+    if current:
+        parts.append(current)
+    return parts
+
+
+async def send_batch(notifier, messages, concurrency=5, rate_per_sec=1.0):
+    """複数のSMSを同時実行数とレートを制限して送信する"""
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate_per_sec)
+
+    async def send_one(message):
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                return await notifier.send(message)
+            except Exception as e:
+                return SendResult(message.to, False, str(e))
+
+    return await asyncio.gather(*(send_one(message) for message in messages))
@@ -0,0 +1,186 @@
+"""
+日次・月末サマリーのSMS通知ジョブ
+Streamlitとは別プロセスで実行する:
+    python -m dailysalesdashboard.scheduler --once --dry-run
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+from .aggregates import AGGREGATE_PATH, load_aggregates, daily_summary, month_to_date_summary
+from .notifier import FakeNotifier, SMSMessage, TwilioSMSNotifier, send_batch, split_body
+
+CONFIG_PATH = "scheduler_config.json"
+
+DEFAULT_CONFIG = {
+    "send_time": "09:00",
+    "concurrency": 5,
+    "rate_per_sec": 1.0,
+    "stores": [],
+}
+
+
+@dataclass
+class JobMetrics:
+    """ジョブ実行の計測結果"""
+    target_date: date
+    stores: int = 0
+    messages: int = 0
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0
+    load_seconds: float = 0.0
+    send_seconds: float = 0.0
+    duration_seconds: float = 0.0
+    errors: list = field(default_factory=list)
+
+    def format(self):
+        return (f"[summary-job] 対象日={self.target_date} 店舗数={self.stores} "
+                f"送信={self.sent}/{self.messages} 失敗={self.failed} 集計なし={self.skipped} "
+                f"集計読込={self.load_seconds:.3f}s 送信={self.send_seconds:.3f}s "
+                f"合計={self.duration_seconds:.3f}s")
+
+
+def load_config(path=CONFIG_PATH):
+    """設定ファイルを読み込む（ない場合は環境変数の宛先で1店舗として扱う）"""
+    config = dict(DEFAULT_CONFIG)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config.update(json.load(f))
+    if not config["stores"]:
+        recipients = [r.strip() for r in os.environ.get("SUMMARY_RECIPIENTS", "").split(",") if r.strip()]
+        config["stores"] = [{"name": "本店", "aggregates_path": AGGREGATE_PATH, "recipients": recipients}]
+    return config
+
+
+def format_store_summary(store_name, target_date, day, month):
+    """1店舗分のサマリー本文を作成する"""
+    label = "月次確定" if month["is_month_end"] else "月間累計"
+    return (f"【{store_name}】{target_date.month}/{target_date.day} 売上\n"
+            f"昼 ¥{day['lunch']:,} / 夜 ¥{day['dinner']:,} / 計 ¥{day['total']:,}\n"
+            f"{target_date.month}月{label} ¥{month['total']:,}（{month['days']}日分）")
+
+
+async def build_messages(config, target_date, metrics):
+    """
+    店舗ごとの集計を並行して読み込み、宛先ごとに1通へまとめる
+    対象日の集計がない店舗は¥0として送らずにスキップし、エラーとして記録する
+    """
+    stores = config["stores"]
+    started = time.perf_counter()
+    aggregates = await asyncio.gather(*(
+        asyncio.to_thread(load_aggregates, store.get("aggregates_path", AGGREGATE_PATH))
+        for store in stores
+    ))
+    metrics.load_seconds = time.perf_counter() - started
+    metrics.stores = len(stores)
+
+    # 同じ宛先に複数店舗のサマリーを送る場合は1通にまとめる
+    bodies = {}
+    day = target_date.strftime("%Y-%m-%d")
+    for store, agg in zip(stores, aggregates):
+        if not (agg["日付"] == day).any():
+            metrics.skipped += 1
+            path = store.get("aggregates_path", AGGREGATE_PATH)
+            metrics.errors.append(f"{store['name']}: {day}の集計がありません（{path}）")
+            continue
+        summary = format_store_summary(
+            store["name"], target_date,
+            daily_summary(agg, target_date),
+            month_to_date_summary(agg, target_date),
+        )
+        for recipient in store.get("recipients", []):
+            bodies.setdefault(recipient, []).append(summary)
+
+    messages = []
+    for recipient, summaries in bodies.items():
+        for part in split_body("\n\n".join(summaries)):
+            messages.append(SMSMessage(recipient, part))
+    return messages
+
+
+async def run_job(config, notifier, target_date=None):
+    """前日分と月間累計のサマリーを送信する"""
+    if target_date is None:
+        target_date = date.today() - timedelta(days=1)
+    metrics = JobMetrics(target_date)
+    started = time.perf_counter()
+
+    messages = await build_messages(config, target_date, metrics)
+    metrics.messages = len(messages)
+
+    send_started = time.perf_counter()
+    results = await send_batch(notifier, messages,
+                               concurrency=config["concurrency"],
+                               rate_per_sec=config["rate_per_sec"])
+    metrics.send_seconds = time.perf_counter() - send_started
+
+    for result in results:
+        if result.ok:
+            metrics.sent += 1
+        else:
+            metrics.failed += 1
+            metrics.errors.append(f"{result.to}: 送信失敗 {result.error}")
+
+    metrics.duration_seconds = time.perf_counter() - started
+    return metrics
+
+
+def next_run_time(send_time, now=None):
+    """次回の実行時刻を求める"""
+    now = now or datetime.now()
+    hour, minute = (int(v) for v in send_time.split(":"))
+    run_at = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if run_at <= now:
+        run_at += timedelta(days=1)
+    return run_at
+
+
+async def run_forever(config, notifier):
+    """毎日指定時刻にジョブを実行する"""
+    while True:
+        run_at = next_run_time(config["send_time"])
+        print(f"[summary-job] 次回実行: {run_at:%Y-%m-%d %H:%M}")
+        await asyncio.sleep((run_at - datetime.now()).total_seconds())
+        try:
+            metrics = await run_job(config, notifier)
+            print(metrics.format())
+            for error in metrics.errors:
+                print(f"[summary-job] エラー {error}")
+        except Exception as e:
+            print(f"[summary-job] ジョブ実行エラー: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="売上サマリーのSMS通知ジョブ")
+    parser.add_argument("--config", default=CONFIG_PATH, help="設定ファイル（JSON）")
+    parser.add_argument("--once", action="store_true", help="1回だけ実行して終了する")
+    parser.add_argument("--date", help="対象日（YYYY-MM-DD、省略時は前日）")
+    parser.add_argument("--dry-run", action="store_true", help="送信せずに本文を表示する")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if not any(store.get("recipients") for store in config["stores"]):
+        # cronで実行している場合に、設定漏れのまま正常終了に見えないようにする
+        print(f"[summary-job] 警告: 宛先がありません（{args.config}のstoresか環境変数SUMMARY_RECIPIENTSを設定してください）")
+        return 2
+    notifier = FakeNotifier(echo=True) if args.dry_run else TwilioSMSNotifier.from_env()
+
+    if args.once:
+        target_date = datetime.strptime(args.date, "%Y-%m-%d").date() if args.date else None
+        metrics = asyncio.run(run_job(config, notifier, target_date))
+        print(metrics.format())
+        for error in metrics.errors:
+            print(f"[summary-job] エラー {error}")
+        return 1 if metrics.failed or metrics.skipped else 0
+
+    asyncio.run(run_forever(config, notifier))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
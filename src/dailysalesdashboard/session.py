@@ -0,0 +1,111 @@
+"""
+売上入力画面のセッション状態
+年月ごとの入力値（日×項目の配列）を1つのオブジェクトにまとめ、入力欄のキーは年月ごとの名前空間に分ける
+月を切り替えても古いキーを探して削除する必要はない（表示されなくなった入力欄の状態はStreamlitが破棄する）
+未保存の入力がある月は、直近のMAX_EDITED_MONTHSか月分だけ保持する
+"""
+import calendar
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+ENTRY_FIELDS = ["lunch", "dinner", "card", "paypay", "stella"]
+PAYMENT_TYPES = ["card", "paypay", "stella"]
+FIELD_INDEX = {field: i for i, field in enumerate(ENTRY_FIELDS)}
+# 未保存の入力を保持しておく月数（表示中の月を除く）
+MAX_EDITED_MONTHS = 3
+
+
+def widget_key(year, month, day, field):
+    """入力欄のキー（年月ごとの名前空間）"""
+    return f"entry:{year}-{month:02d}:{field}_{day}"
+
+
+class MonthEntry:
+    """1か月分の入力値"""
+
+    def __init__(self, year, month):
+        self.year = year
+        self.month = month
+        self.last_day = calendar.monthrange(year, month)[1]
+        self.values = np.zeros((self.last_day, len(ENTRY_FIELDS)), dtype=np.int64)
+        self.edited = False
+
+    def widget_key(self, day, field):
+        return widget_key(self.year, self.month, day, field)
+
+    def load(self, data):
+        """保存済みのデータからこの月の入力値を設定する（支払方法の行は夜営業として保存されているため時間帯から除外する）"""
+        self.values[:] = 0
+        self.edited = False
+
+        prefix = f"{self.year}-{self.month:02d}-"
+        month_data = data[data["日付"].astype(str).str.startswith(prefix)]
+        if month_data.empty:
+            return
+        days = month_data["日付"].str[8:10].astype(int).to_numpy() - 1
+        payment = month_data["支払方法"]
+        fields = payment.where(payment.isin(PAYMENT_TYPES),
+                               np.where(month_data["時間帯"] == "昼営業", "lunch", "dinner"))
+        totals = np.zeros(self.values.shape)
+        np.add.at(totals, (days, fields.map(FIELD_INDEX).to_numpy()),
+                  month_data["売上金額"].fillna(0).to_numpy(dtype=float))
+        self.values[:] = totals.astype(np.int64)
+
+    def has_widgets(self):
+        """入力欄の状態が残っているか（月の切り替えやページ移動の後は破棄されている）"""
+        return self.widget_key(1, ENTRY_FIELDS[0]) in st.session_state
+
+    def seed_widgets(self):
+        """入力欄の初期値を入力値から設定する（0は空欄）"""
+        for day in range(1, self.last_day + 1):
+            for field, value in zip(ENTRY_FIELDS, self.values[day - 1]):
+                st.session_state[self.widget_key(day, field)] = str(value) if value > 0 else ""
+
+    def set_value(self, day, field, value):
+        self.values[day - 1, FIELD_INDEX[field]] = value
+
+    def totals(self):
+        """項目ごとの月間合計"""
+        return {field: int(total) for field, total in zip(ENTRY_FIELDS, self.values.sum(axis=0))}
+
+    def sales_data(self):
+        """保存用の日ごとの入力値"""
+        return {day: {field: int(value) for field, value in zip(ENTRY_FIELDS, row)}
+                for day, row in enumerate(self.values, start=1)}
+
+
+class EntrySession:
+    """セッションごとの売上入力の状態（表示中の月と、未保存の入力がある直近の月）"""
+
+    def __init__(self, max_edited=MAX_EDITED_MONTHS):
+        self.current = None
+        self.edited_months = OrderedDict()
+        self.max_edited = max_edited
+
+    def activate(self, year, month, data):
+        """
+        表示する月の入力状態を返す。月を切り替えたかどうかも返す
+        入力欄の状態が破棄されている場合は、未保存の入力がなければ保存済みのデータから読み直す
+        """
+        switched = self.current is None or (self.current.year, self.current.month) != (year, month)
+        if switched:
+            if self.current is not None and self.current.edited:
+                self.edited_months[(self.current.year, self.current.month)] = self.current
+                while len(self.edited_months) > self.max_edited:
+                    self.edited_months.popitem(last=False)
+            self.current = self.edited_months.pop((year, month), None) or MonthEntry(year, month)
+
+        entry = self.current
+        if not entry.has_widgets():
+            if not entry.edited:
+                entry.load(data)
+            entry.seed_widgets()
+        return entry, switched
+
+    def lookup(self, year, month):
+        """表示中または未保存の入力がある月の入力状態（ない場合はNone）"""
+        if self.current is not None and (self.current.year, self.current.month) == (year, month):
+            return self.current
+        return self.edited_months.get((year, month))
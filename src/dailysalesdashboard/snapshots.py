@@ -0,0 +1,241 @@
+"""
+売上データのスナップショット（月単位・内容アドレス方式）
+月ごとのデータをハッシュ値で保存し、スナップショットは「月→ハッシュ」の対応表（マニフェスト）として記録する
+内容が変わらない月は前回のオブジェクトを共有するため、保存・復元は変更のあった月数に比例する
+    python -m dailysalesdashboard.snapshots list
+    python -m dailysalesdashboard.snapshots restore <スナップショットID>
+複数のセッションが同時に保存してもよいように、共有したオブジェクトは更新時刻を新しくし、
+一定時間内に書き込み・共有されたオブジェクトは参照されていなくても削除しない
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from .aggregates import update_aggregates
+from .anomaly import update_anomalies
+from .utils import atomic_write, forget_ingested, load_data, save_data
+
+SNAPSHOT_DIR = "snapshots"
+OBJECT_DIR = os.path.join(SNAPSHOT_DIR, "objects")
+MANIFEST_DIR = os.path.join(SNAPSHOT_DIR, "manifests")
+
+DATA_COLUMNS = ["日付", "時間帯", "支払方法", "売上金額", "備考"]
+
+# 保持ポリシー（最新の件数と日数。最新のスナップショットは常に保持する）
+KEEP_LAST = 50
+KEEP_DAYS = 90
+# 書き込み・共有してからこの秒数が経っていないオブジェクトは削除しない（マニフェストの書き込み待ちのため）
+OBJECT_GRACE_SECONDS = 600
+
+
+def _month_frames(df, months=None):
+    """データを月（'YYYY-MM'）ごとに分割する"""
+    if df.empty:
+        return {}
+    month_keys = df["日付"].astype(str).str[:7]
+    if months is not None:
+        mask = month_keys.isin(set(months))
+        df, month_keys = df[mask], month_keys[mask]
+    return {month: frame for month, frame in df.groupby(month_keys)}
+
+
+def _store_month(frame):
+    """1か月分のデータをオブジェクトとして保存し、ハッシュ値を返す"""
+    frame = frame.reindex(columns=DATA_COLUMNS)
+    frame = frame.sort_values(["日付", "時間帯", "支払方法"], ignore_index=True)
+    content = frame.to_csv(index=False).encode("utf-8")
+    digest = hashlib.sha256(content).hexdigest()
+    path = os.path.join(OBJECT_DIR, f"{digest}.csv.gz")
+    try:
+        # 既存のオブジェクトを共有する場合は更新時刻を新しくし、他のセッションの削除対象から外す
+        os.utime(path)
+    except FileNotFoundError:
+        with atomic_write(path, "wb") as f:
+            f.write(gzip.compress(content))
+    return digest
+
+
+def _load_month(digest):
+    """オブジェクトから1か月分のデータを読み込む"""
+    return pd.read_csv(os.path.join(OBJECT_DIR, f"{digest}.csv.gz"), dtype={"日付": str})
+
+
+def list_snapshots():
+    """スナップショットの一覧を新しい順に返す"""
+    if not os.path.isdir(MANIFEST_DIR):
+        return []
+    snapshots = []
+    for name in sorted(os.listdir(MANIFEST_DIR), reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(MANIFEST_DIR, name), encoding="utf-8") as f:
+                snapshots.append(json.load(f))
+    return snapshots
+
+
+def load_snapshot(snapshot_id):
+    """スナップショットのマニフェストを読み込む"""
+    with open(os.path.join(MANIFEST_DIR, f"{snapshot_id}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def latest_snapshot():
+    """最新のスナップショットを返す（ない場合はNone）"""
+    if not os.path.isdir(MANIFEST_DIR):
+        return None
+    names = sorted(name for name in os.listdir(MANIFEST_DIR) if name.endswith(".json"))
+    if not names:
+        return None
+    return load_snapshot(names[-1][:-len(".json")])
+
+
+def record_snapshot(df, changed_months=None, reason=""):
+    """
+    現在のデータのスナップショットを記録する
+    changed_monthsを指定した場合はその月だけを保存し、他の月は最新のスナップショットの内容を引き継ぐ
+    """
+    try:
+        latest = latest_snapshot()
+        if changed_months is None or latest is None:
+            months = {month: _store_month(frame) for month, frame in _month_frames(df).items()}
+            changed = sorted(months)
+        else:
+            months = dict(latest["months"])
+            frames = _month_frames(df, changed_months)
+            for month in changed_months:
+                if month in frames:
+                    months[month] = _store_month(frames[month])
+                else:
+                    months.pop(month, None)
+            changed = sorted(changed_months)
+
+        now = datetime.now()
+        snapshot_id = now.strftime("%Y%m%dT%H%M%S%f")
+        manifest = {
+            "id": snapshot_id,
+            "created_at": now.isoformat(timespec="seconds"),
+            "reason": reason,
+            "changed": changed,
+            "months": months,
+        }
+        with atomic_write(os.path.join(MANIFEST_DIR, f"{snapshot_id}.json")) as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        apply_retention()
+        return snapshot_id
+    except Exception as e:
+        print(f"スナップショット保存エラー: {e}")
+        return None
+
+
+def ensure_baseline(df):
+    """スナップショットがまだない場合、変更前の状態を記録しておく"""
+    if latest_snapshot() is None and not df.empty:
+        record_snapshot(df, reason="初期状態")
+
+
+def restore_snapshot(df, snapshot_id):
+    """
+    指定したスナップショットの状態に戻したデータと、変更された月の一覧を返す
+    最新のスナップショットと内容が異なる月だけを読み込んで置き換える
+    """
+    target = load_snapshot(snapshot_id)["months"]
+    latest = latest_snapshot()
+    current = latest["months"] if latest else {}
+
+    changed = sorted(month for month in set(target) | set(current)
+                     if target.get(month) != current.get(month))
+    if not changed:
+        return df, []
+
+    restored = [_load_month(target[month]) for month in changed if month in target]
+    kept = df[~df["日付"].astype(str).str[:7].isin(set(changed))]
+    frames = [frame for frame in [kept] + restored if not frame.empty]
+    data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=DATA_COLUMNS)
+    return data.sort_values("日付", ignore_index=True), changed
+
+
+def restore_and_save(df, snapshot_id):
+    """スナップショットの状態に戻して保存し、集計と異常検知も更新する"""
+    data, changed = restore_snapshot(df, snapshot_id)
+    if not changed:
+        return df, [], True
+    if not save_data(data, changed):
+        return df, changed, False
+    for month in changed:
+        forget_ingested(f"{month}-01", f"{month}-31")
+    update_aggregates(data, changed)
+    update_anomalies(changed)
+    record_snapshot(data, changed, reason=f"復元 {snapshot_id}")
+    return data, changed, True
+
+
+def apply_retention(keep_last=KEEP_LAST, keep_days=KEEP_DAYS):
+    """保持ポリシーを超えたスナップショットと、どこからも参照されないオブジェクトを削除する"""
+    if not os.path.isdir(MANIFEST_DIR):
+        return
+    names = sorted((name for name in os.listdir(MANIFEST_DIR) if name.endswith(".json")), reverse=True)
+    cutoff = (datetime.now() - timedelta(days=keep_days)).strftime("%Y%m%dT%H%M%S%f")
+
+    # 猶予時間内で前回削除しなかったオブジェクトもあるため、期限切れがなくても参照されないオブジェクトを確認する
+    expired = [name for i, name in enumerate(names)
+               if i > 0 and (i >= keep_last or name[:-len(".json")] < cutoff)]
+    for name in expired:
+        try:
+            os.remove(os.path.join(MANIFEST_DIR, name))
+        except FileNotFoundError:
+            pass  # 他のセッションが削除済み
+
+    referenced = set()
+    for snapshot in list_snapshots():
+        referenced.update(snapshot["months"].values())
+    grace_cutoff = time.time() - OBJECT_GRACE_SECONDS
+    for name in os.listdir(OBJECT_DIR):
+        if not name.endswith(".csv.gz") or name[:-len(".csv.gz")] in referenced:
+            continue
+        path = os.path.join(OBJECT_DIR, name)
+        try:
+            if os.path.getmtime(path) < grace_cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def format_snapshot(snapshot):
+    """画面表示用のスナップショット名"""
+    created_at = snapshot["created_at"].replace("T", " ")
+    changed = snapshot["changed"]
+    months = ", ".join(changed[:3]) + (f" 他{len(changed) - 3}か月" if len(changed) > 3 else "")
+    return f"{created_at} {snapshot['reason']}（{months}）"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="売上データのスナップショット")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="スナップショットの一覧")
+    restore_parser = subparsers.add_parser("restore", help="スナップショットの状態に戻す")
+    restore_parser.add_argument("snapshot_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for snapshot in list_snapshots():
+            print(f"{snapshot['id']}  {format_snapshot(snapshot)}")
+        return 0
+
+    _, changed, ok = restore_and_save(load_data(), args.snapshot_id)
+    if not ok:
+        print("データの保存に失敗しました")
+        return 1
+    if not changed:
+        print("変更はありません")
+        return 0
+    print(f"{len(changed)}か月分を復元しました: {', '.join(changed)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
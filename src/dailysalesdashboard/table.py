@@ -0,0 +1,152 @@
+import streamlit as st
+import pandas as pd
+import numpy as np
+import math
+import os
+
+from .aggregates import AGGREGATE_PATH, load_aggregates
+
+# 表示列（日別集計の項目名と画面上の列名）
+TABLE_COLUMNS = {
+    "lunch": "昼営業",
+    "dinner": "夜営業",
+    "card": "カード",
+    "paypay": "PayPay",
+    "stella": "stella",
+}
+PAGE_SIZES = [25, 50, 100, 200]
+# キャッシュに残すバージョン数（保存のたびに新しいバージョンになるため上限を設ける）
+AGGREGATE_CACHE_ENTRIES = 2
+EXPORT_CACHE_ENTRIES = 8
+
+
+def date_window(agg, start_date, end_date):
+    """日付でソート済みの日別集計から、指定期間の行の範囲[lo, hi)を二分探索で求める"""
+    lo = int(agg["日付"].searchsorted(str(start_date), side="left"))
+    hi = int(agg["日付"].searchsorted(str(end_date), side="right"))
+    return lo, hi
+
+
+def row_order(agg, lo, hi, sort_column, ascending):
+    """期間内の行を並び替えた位置の配列を返す（日付順はソート不要）"""
+    if sort_column == "日付":
+        positions = np.arange(lo, hi)
+    else:
+        values = agg[sort_column].to_numpy()[lo:hi]
+        positions = lo + np.argsort(values, kind="stable")
+    return positions if ascending else positions[::-1]
+
+
+def format_page(page):
+    """表示するページの行だけを金額表示に変換する"""
+    formatted = pd.DataFrame({"日付": page["日付"].to_numpy()})
+    for field, label in TABLE_COLUMNS.items():
+        formatted[label] = [f"¥{value:,.0f}" for value in page[field].to_numpy()]
+    return formatted
+
+
+@st.cache_data(show_spinner=False, max_entries=AGGREGATE_CACHE_ENTRIES)
+def _cached_aggregates(version):
+    """日別集計をバージョン（ファイルの更新時刻）ごとにキャッシュする"""
+    return load_aggregates()
+
+
+def table_version():
+    """日別集計ファイルの更新時刻（ファイルがない場合はNone）"""
+    try:
+        return os.path.getmtime(AGGREGATE_PATH)
+    except OSError:
+        return None
+
+
+def load_table_source(version=None):
+    """表示用の日別集計を読み込む（ファイルが更新されていなければキャッシュを使う）"""
+    return _cached_aggregates(table_version() if version is None else version)
+
+
+@st.cache_data(show_spinner=False, max_entries=EXPORT_CACHE_ENTRIES)
+def export_csv(version, lo, hi):
+    """期間内の日別集計をCSVに変換する（ページ切り替えの再実行では作り直さない）"""
+    export = _cached_aggregates(version).iloc[lo:hi].rename(columns=TABLE_COLUMNS)
+    return export.to_csv(index=False)
+
+
+def _reset_page(page_key):
+    """並び替えや表示件数を変えたときは先頭ページに戻す"""
+    st.session_state[page_key] = 1
+
+
+def render_paginated_table(agg, start_date, end_date, key="sales_table"):
+    """
+    日別集計をページ単位で表示する
+    並び替え・ページ切り替え・日付ジャンプは表示する行の位置だけを計算し、金額の書式化は表示中のページのみ行う
+    """
+    lo, hi = date_window(agg, start_date, end_date)
+    total_rows = hi - lo
+    if total_rows == 0:
+        return lo, hi
+
+    page_key = f"{key}_page"
+
+    col1, col2, col3, col4 = st.columns([1.5, 1, 1, 1.5])
+    with col1:
+        sort_label = st.selectbox(
+            "並び替え",
+            ["日付"] + list(TABLE_COLUMNS.values()),
+            key=f"{key}_sort",
+            on_change=_reset_page,
+            args=(page_key,)
+        )
+    with col2:
+        ascending = st.radio(
+            "順序",
+            ["降順", "昇順"],
+            horizontal=True,
+            key=f"{key}_order",
+            on_change=_reset_page,
+            args=(page_key,)
+        ) == "昇順"
+    with col3:
+        page_size = st.selectbox("表示件数", PAGE_SIZES, key=f"{key}_page_size",
+                                 on_change=_reset_page, args=(page_key,))
+    with col4:
+        jump_date = st.date_input(
+            "日付へ移動",
+            value=None,
+            min_value=pd.Timestamp(agg["日付"].iloc[lo]).date(),
+            max_value=pd.Timestamp(agg["日付"].iloc[hi - 1]).date(),
+            key=f"{key}_jump"
+        )
+
+    sort_column = "日付" if sort_label == "日付" else \
+        next(field for field, label in TABLE_COLUMNS.items() if label == sort_label)
+    positions = row_order(agg, lo, hi, sort_column, ascending)
+    page_count = math.ceil(total_rows / page_size)
+
+    # 日付へ移動: 指定日を含むページに切り替える（変更されたときだけ）
+    if jump_date is not None and st.session_state.get(f"{key}_last_jump") != jump_date:
+        st.session_state[f"{key}_last_jump"] = jump_date
+        target = int(agg["日付"].searchsorted(str(jump_date)))
+        target = min(max(target, lo), hi - 1)
+        index = int(np.flatnonzero(positions == target)[0])
+        st.session_state[page_key] = index // page_size + 1
+    if st.session_state.get(page_key, 1) > page_count:
+        st.session_state[page_key] = page_count
+
+    page = st.number_input(
+        "ページ",
+        min_value=1,
+        max_value=page_count,
+        step=1,
+        key=page_key
+    )
+
+    first = (page - 1) * page_size
+    visible = positions[first:first + page_size]
+    st.dataframe(
+        format_page(agg.iloc[visible]),
+        use_container_width=True,
+        hide_index=True
+    )
+    st.caption(f"全{total_rows:,}件中 {first + 1:,}〜{first + len(visible):,}件目（{page}/{page_count}ページ）")
+    return lo, hi
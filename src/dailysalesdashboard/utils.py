@@ -1,26 +1,244 @@
 import pandas as pd
+from contextlib import contextmanager
 from datetime import datetime
+import calendar
+import tempfile
+import json
 import os
+import shutil
+
+DATA_COLUMNS = ['日付', '時間帯', '支払方法', '売上金額', '備考']
+
+# 旧形式（1ファイル）の売上データ
+LEGACY_DATA_PATH = 'sales_data.csv'
+# 月ごとのパーティション（YYYY-MM.csv）と、月の一部を削除した記録（トゥームストーン）
+PARTITION_DIR = 'sales_data'
+TOMBSTONE_PATH = os.path.join(PARTITION_DIR, 'tombstones.json')
+# トゥームストーンがこの件数を超えたら該当月のパーティションを書き直して削除する
+COMPACT_THRESHOLD = 24
+# POSログから取り込んだ日ごとの、ログ別の金額（取り込み以外で書き直した日は記録から外す）
+INGEST_LEDGER_PATH = os.path.join(PARTITION_DIR, 'ingest_ledger.json')
+
+def _partition_path(month):
+    return os.path.join(PARTITION_DIR, f"{month}.csv")
+
+def _partition_months():
+    """保存されているパーティションの月の一覧"""
+    if not os.path.isdir(PARTITION_DIR):
+        return []
+    return sorted(name[:-len(".csv")] for name in os.listdir(PARTITION_DIR) if name.endswith(".csv"))
+
+def load_tombstones():
+    """トゥームストーン（月の一部の削除記録）を読み込む"""
+    if not os.path.exists(TOMBSTONE_PATH):
+        return []
+    with open(TOMBSTONE_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_tombstones(tombstones):
+    with atomic_write(TOMBSTONE_PATH) as f:
+        json.dump(tombstones, f, ensure_ascii=False)
+
+def load_ingest_ledger():
+    """POSログの取り込み記録（日付→ログ→項目ごとの金額）を読み込む"""
+    if not os.path.exists(INGEST_LEDGER_PATH):
+        return {}
+    with open(INGEST_LEDGER_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_ingest_ledger(ledger):
+    with atomic_write(INGEST_LEDGER_PATH) as f:
+        json.dump(ledger, f, ensure_ascii=False)
+
+def forget_ingested(start_date, end_date):
+    """削除・復元・手入力で書き直した期間の日を、POSログの取り込み記録から外す"""
+    start, end = str(start_date), str(end_date)
+    ledger = load_ingest_ledger()
+    kept = {day: shares for day, shares in ledger.items() if not start <= day <= end}
+    if len(kept) != len(ledger):
+        save_ingest_ledger(kept)
+
+def apply_tombstones(df, tombstones):
+    """トゥームストーンで削除された期間の行を除外する"""
+    if df.empty or not tombstones:
+        return df
+    dates = df['日付'].astype(str)
+    deleted = pd.Series(False, index=df.index)
+    for tombstone in tombstones:
+        deleted |= (dates >= tombstone['start']) & (dates <= tombstone['end'])
+    return df.loc[~deleted]
+
+def _migrate_legacy():
+    """
+    旧形式のファイルを月ごとのパーティションに移行する
+    一時ディレクトリに書き出してから名前を変えるため、途中で失敗しても書きかけのパーティションは読まれない
+    他のセッションが先に移行した場合は何もしない
+    """
+    try:
+        data = pd.read_csv(LEGACY_DATA_PATH, dtype={'日付': str})
+    except FileNotFoundError:
+        return
+
+    parent = os.path.dirname(os.path.abspath(PARTITION_DIR))
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=f".{os.path.basename(PARTITION_DIR)}.")
+    try:
+        month_keys = data['日付'].astype(str).str[:7]
+        for month, frame in data.groupby(month_keys):
+            frame.sort_values('日付').to_csv(os.path.join(tmp_dir, f"{month}.csv"), index=False)
+        try:
+            os.rename(tmp_dir, PARTITION_DIR)
+        except OSError:
+            if os.path.isdir(PARTITION_DIR):
+                return
+            raise
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    try:
+        os.replace(LEGACY_DATA_PATH, f"{LEGACY_DATA_PATH}.migrated")
+    except FileNotFoundError:
+        pass
 
 def load_data():
     """データの読み込み"""
     try:
-        if os.path.exists('sales_data.csv'):
-            return pd.read_csv('sales_data.csv')
-        return pd.DataFrame(columns=['日付', '時間帯', '支払方法', '売上金額', '備考'])
+        if not os.path.isdir(PARTITION_DIR) and os.path.exists(LEGACY_DATA_PATH):
+            _migrate_legacy()
+        if os.path.isdir(PARTITION_DIR):
+            frames = [pd.read_csv(_partition_path(month), dtype={'日付': str}) for month in _partition_months()]
+            frames = [frame for frame in frames if not frame.empty]
+            if not frames:
+                return pd.DataFrame(columns=DATA_COLUMNS)
+            data = pd.concat(frames, ignore_index=True)
+            return apply_tombstones(data, load_tombstones()).reset_index(drop=True)
+        return pd.DataFrame(columns=DATA_COLUMNS)
     except Exception as e:
         print(f"データ読み込みエラー: {e}")
-        return pd.DataFrame(columns=['日付', '時間帯', '支払方法', '売上金額', '備考'])
+        return pd.DataFrame(columns=DATA_COLUMNS)
+
+@contextmanager
+def atomic_write(path, mode="w"):
+    """
+    一時ファイルに書き込み、書き終えたら置き換える（書き込み途中のファイルを他のセッションが読まないようにする）
+    途中で失敗した場合は一時ファイルを削除し、元のファイルはそのまま残す
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    options = {} if "b" in mode else {"encoding": "utf-8", "newline": ""}
+    try:
+        with os.fdopen(fd, mode, **options) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_csv_atomic(df, path):
+    """CSVを一時ファイルに書き込んでから置き換える"""
+    with atomic_write(path) as f:
+        df.to_csv(f, index=False)
 
-def save_data(df):
-    """データの保存"""
+def save_data(df, months=None):
+    """
+    データの保存
+    monthsを指定した場合はその月（'YYYY-MM'）のパーティションだけを書き直す
+    """
     try:
-        df.to_csv('sales_data.csv', index=False)
+        month_keys = df['日付'].astype(str).str[:7]
+        if months is None:
+            months = set(month_keys) | set(_partition_months())
+        months = set(months)
+
+        target = month_keys.isin(months)
+        frames = dict(tuple(df.loc[target].groupby(month_keys[target])))
+        for month in sorted(months):
+            if month in frames:
+                write_csv_atomic(frames[month].sort_values('日付'), _partition_path(month))
+            elif os.path.exists(_partition_path(month)):
+                os.remove(_partition_path(month))
+
+        # 書き直した月のトゥームストーンは反映済みのため削除する
+        tombstones = load_tombstones()
+        remaining = [tombstone for tombstone in tombstones if tombstone['month'] not in months]
+        if len(remaining) != len(tombstones):
+            _save_tombstones(remaining)
         return True
     except Exception as e:
         print(f"データ保存エラー: {e}")
         return False
 
+def delete_range(df, start_date, end_date):
+    """
+    指定期間のデータを削除する
+    期間が月全体を含む場合はパーティションファイルごと削除し、月の一部の場合はトゥームストーンを追加する
+    削除後のデータ、削除対象になった月の一覧、成否を返す
+    """
+    start, end = str(start_date), str(end_date)
+    months = list(pd.period_range(start, end, freq="M").strftime("%Y-%m"))
+    try:
+        _drop_partitions(start, end, months)
+        forget_ingested(start, end)
+    except Exception as e:
+        print(f"データ削除エラー: {e}")
+        return df, months, False
+
+    dates = df['日付'].astype(str)
+    return df.loc[(dates < start) | (dates > end)].reset_index(drop=True), months, True
+
+def _drop_partitions(start, end, months):
+    """月全体が対象のパーティションを削除し、月の一部はトゥームストーンとして記録する"""
+    tombstones = load_tombstones()
+    for month in months:
+        year, month_num = (int(v) for v in month.split("-"))
+        month_start = f"{month}-01"
+        month_end = f"{month}-{calendar.monthrange(year, month_num)[1]:02d}"
+        if start <= month_start and month_end <= end:
+            if os.path.exists(_partition_path(month)):
+                os.remove(_partition_path(month))
+            tombstones = [tombstone for tombstone in tombstones if tombstone['month'] != month]
+        elif os.path.exists(_partition_path(month)):
+            tombstones.append({
+                'month': month,
+                'start': max(start, month_start),
+                'end': min(end, month_end),
+            })
+    _save_tombstones(tombstones)
+
+    if len(tombstones) > COMPACT_THRESHOLD:
+        compact_partitions()
+
+def compact_partitions():
+    """トゥームストーンのある月のパーティションを書き直し、トゥームストーンを削除する"""
+    tombstones = load_tombstones()
+    for month in sorted({tombstone['month'] for tombstone in tombstones}):
+        path = _partition_path(month)
+        if not os.path.exists(path):
+            continue
+        month_tombstones = [tombstone for tombstone in tombstones if tombstone['month'] == month]
+        data = apply_tombstones(pd.read_csv(path, dtype={'日付': str}), month_tombstones)
+        if data.empty:
+            os.remove(path)
+        else:
+            write_csv_atomic(data, path)
+    _save_tombstones([])
+
+def build_sales_records(date_str, values):
+    """1日分の売上（lunch/dinner/card/paypay/stella）を保存用のレコードに変換する"""
+    records = []
+    for payment_type, amount in values.items():
+        if amount > 0:
+            records.append({
+                "日付": date_str,
+                "時間帯": "昼営業" if payment_type == "lunch" else "夜営業",
+                "支払方法": payment_type,
+                "売上金額": amount,
+                "備考": ""
+            })
+    return records
+
 def validate_sales_data(date, amount):
     """売上データのバリデーション"""
     try:
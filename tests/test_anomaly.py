@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dailysalesdashboard.anomaly import (anomaly_message, detect_anomalies, load_anomalies,
+                                        month_baselines, update_anomalies)
+
+
+def make_aggregates(start="2024-01-01", end="2024-06-30", seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, end, freq="D")
+    return pd.DataFrame({
+        "日付": dates.strftime("%Y-%m-%d"),
+        "lunch": (10000 + rng.normal(0, 300, len(dates))).astype("int64"),
+        "dinner": (30000 + rng.normal(0, 900, len(dates))).astype("int64"),
+        "card": 0,
+        "paypay": 0,
+        "stella": 0,
+    })
+
+
+def set_value(agg, day, field, value):
+    agg = agg.copy()
+    agg.loc[agg["日付"] == day, field] = value
+    return agg
+
+
+@pytest.fixture
+def agg():
+    return set_value(make_aggregates(), "2024-05-15", "lunch", 50000)
+
+
+def test_detect_anomalies_flags_outlier(agg):
+    flags = detect_anomalies(agg, "2024-05-01", "2024-05-31")
+    assert list(zip(flags["日付"], flags["項目"])) == [("2024-05-15", "lunch")]
+    assert abs(flags["基準値"].iloc[0] - 10000) < 500
+    assert flags["スコア"].iloc[0] > 0
+
+    # 基準を計算できるだけの過去データがない期間は判定しない
+    assert detect_anomalies(agg, "2024-01-01", "2024-01-28").empty
+
+
+def test_anomaly_message(agg):
+    baselines = month_baselines(agg, 2024, 5)
+    baseline = baselines[20]["lunch"]
+    assert "昼営業" in anomaly_message(50000, "lunch", baseline)
+    assert anomaly_message(10100, "lunch", baseline) == ""
+    assert anomaly_message(0, "lunch", baseline) == ""
+    assert anomaly_message(50000, "lunch", month_baselines(agg, 2024, 1)[1].get("lunch")) == ""
+
+
+def test_incremental_update_matches_full_recompute(agg, tmp_path):
+    path = str(tmp_path / "anomalies.csv")
+    assert update_anomalies(agg=agg, path=path)
+
+    # 3月に異常値を追加し、5月の異常値を修正してから変更した月だけ更新する
+    changed = set_value(agg, "2024-03-12", "dinner", 90000)
+    changed = set_value(changed, "2024-05-15", "lunch", 10000)
+    assert update_anomalies(["2024-03", "2024-05"], agg=changed, path=path)
+
+    full_path = str(tmp_path / "full.csv")
+    assert update_anomalies(agg=changed, path=full_path)
+    incremental = load_anomalies(path).reset_index(drop=True)
+    full = load_anomalies(full_path).reset_index(drop=True)
+    pd.testing.assert_frame_equal(incremental, full)
+    assert "2024-03-12" in set(full["日付"])
+    assert "2024-05-15" not in set(full["日付"])
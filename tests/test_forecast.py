@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from dailysalesdashboard.forecast import fit_forecasts
+
+
+def make_aggregates(start, end, lunch):
+    dates = pd.date_range(start, end, freq="D")
+    return pd.DataFrame({
+        "日付": dates.strftime("%Y-%m-%d"),
+        "lunch": [lunch(date) for date in dates],
+        "dinner": 0,
+    })
+
+
+def test_closed_weekday_is_forecast_as_zero():
+    # 月曜定休で、それ以外は毎日20,000円
+    agg = make_aggregates("2025-01-01", "2025-03-14", lambda date: 0 if date.weekday() == 0 else 20000)
+    forecast = fit_forecasts(agg)["2025-03"]["lunch"]
+    assert forecast["month_end"] == 26 * 20000
+    assert forecast["next_month"] == 26 * 20000
+
+
+def test_trend_and_weekday_levels():
+    # 週末は平日の1.5倍で、毎週1,000円ずつ増える
+    origin = pd.Timestamp("2025-01-01")
+    agg = make_aggregates(
+        "2025-01-01", "2025-03-31",
+        lambda date: (15000 if date.weekday() >= 5 else 10000) + 1000 * (date - origin).days / 7,
+    )
+    expected = sum(
+        (15000 if date.weekday() >= 5 else 10000) + 1000 * (date - origin).days / 7
+        for date in pd.date_range("2025-04-01", "2025-04-30", freq="D")
+    )
+    assert np.isclose(fit_forecasts(agg)["2025-03"]["lunch"]["next_month"], expected, rtol=1e-3)
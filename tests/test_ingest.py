@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from dailysalesdashboard.ingest import ingest_file, ingest_files
+from dailysalesdashboard.utils import build_sales_records, delete_range, forget_ingested, load_data, save_data
+
+
+def write_log(path, rows):
+    pd.DataFrame(rows, columns=["timestamp", "tender", "amount"]).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def logs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    # 2025-01-01の営業日は翌朝5時までのため、2025-01-02 01:00の取引は1日の夜営業になる
+    first = write_log(tmp_path / "a.csv", [
+        ("2025-01-01 11:00", "cash", 1000),
+        ("2025-01-01 20:00", "card", 5000),
+    ])
+    second = write_log(tmp_path / "b.csv", [
+        ("2025-01-02 01:00", "cash", 300),
+        ("2025-01-02 12:00", "cash", 2000),
+    ])
+    return first, second
+
+
+def day_values(day):
+    data = load_data()
+    rows = data[data["日付"] == day]
+    return dict(zip(rows["支払方法"], rows["売上金額"]))
+
+
+EXPECTED = {"lunch": 1000, "dinner": 5300, "card": 5000}
+
+
+def test_business_day_across_files_in_one_run(logs):
+    ingest_files(list(logs))
+    assert day_values("2025-01-01") == EXPECTED
+    assert day_values("2025-01-02") == {"lunch": 2000}
+
+
+def test_business_day_across_runs(logs):
+    first, second = logs
+    ingest_file(first)
+    ingest_file(second)
+    assert day_values("2025-01-01") == EXPECTED
+
+    # 同じログを取り込み直しても二重に加算しない
+    ingest_file(second)
+    assert day_values("2025-01-01") == EXPECTED
+    assert day_values("2025-01-02") == {"lunch": 2000}
+
+
+def test_deleted_day_is_not_rebuilt_from_old_logs(logs):
+    first, second = logs
+    ingest_file(first)
+    delete_range(load_data(), "2025-01-01", "2025-01-01")
+    assert day_values("2025-01-01") == {}
+
+    # 削除した日に、前回取り込んだログの分が戻らない
+    ingest_file(second)
+    assert day_values("2025-01-01") == {"dinner": 300}
+
+
+def test_hand_corrected_day_keeps_corrections(logs):
+    first, second = logs
+    ingest_file(first)
+
+    # 売上入力画面での修正と同じく、保存した日は取り込み記録から外す
+    data = load_data()
+    data = data[data["日付"] != "2025-01-01"]
+    data = pd.concat([data, pd.DataFrame(build_sales_records("2025-01-01", {"lunch": 1200, "dinner": 4000}))],
+                     ignore_index=True)
+    save_data(data, ["2025-01"])
+    forget_ingested("2025-01-01", "2025-01-31")
+
+    ingest_file(second)
+    assert day_values("2025-01-01") == {"lunch": 1200, "dinner": 4300}
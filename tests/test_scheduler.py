@@ -0,0 +1,137 @@
+import asyncio
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from dailysalesdashboard.aggregates import save_aggregates
+from dailysalesdashboard.notifier import FakeNotifier, Notifier, SMSMessage, send_batch, split_body
+from dailysalesdashboard.scheduler import DEFAULT_CONFIG, main, run_job
+
+TARGET = date(2025, 1, 10)
+
+
+def write_aggregates(path, days):
+    agg = pd.DataFrame({
+        "日付": days,
+        "lunch": 1000,
+        "dinner": 3000,
+        "card": 500,
+        "paypay": 0,
+        "stella": 0,
+    })
+    save_aggregates(agg, str(path))
+    return str(path)
+
+
+def job_config(stores):
+    config = dict(DEFAULT_CONFIG)
+    config.update(rate_per_sec=0, stores=stores)
+    return config
+
+
+def test_notifier_requires_send():
+    with pytest.raises(TypeError):
+        Notifier()
+
+
+def test_missing_recipients_fail(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("SUMMARY_RECIPIENTS", raising=False)
+    assert main(["--once", "--dry-run"]) != 0
+    assert "宛先がありません" in capsys.readouterr().out
+
+
+def test_dry_run_without_aggregates_fails(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SUMMARY_RECIPIENTS", "+810000000000")
+    assert main(["--once", "--dry-run", "--date", "2025-01-10"]) != 0
+    out = capsys.readouterr().out
+    assert "集計がありません" in out
+    assert "SMS to" not in out
+
+
+def test_dry_run_with_aggregates(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SUMMARY_RECIPIENTS", "+810000000000")
+    write_aggregates(tmp_path / "aggregates" / "daily_totals.csv", ["2025-01-09", "2025-01-10"])
+    assert main(["--once", "--dry-run", "--date", "2025-01-10"]) == 0
+    assert "計 ¥4,000" in capsys.readouterr().out
+
+
+def test_summaries_are_batched_per_recipient(tmp_path):
+    first = write_aggregates(tmp_path / "first.csv", ["2025-01-10"])
+    second = write_aggregates(tmp_path / "second.csv", ["2025-01-10"])
+    config = job_config([
+        {"name": "本店", "aggregates_path": first, "recipients": ["+81001", "+81002"]},
+        {"name": "支店", "aggregates_path": second, "recipients": ["+81001"]},
+    ])
+    notifier = FakeNotifier()
+    metrics = asyncio.run(run_job(config, notifier, TARGET))
+
+    assert (metrics.sent, metrics.failed, metrics.skipped) == (2, 0, 0)
+    bodies = {message.to: message.body for message in notifier.sent}
+    assert "【本店】" in bodies["+81001"] and "【支店】" in bodies["+81001"]
+    assert "【本店】" in bodies["+81002"] and "【支店】" not in bodies["+81002"]
+
+
+def test_store_without_target_day_is_skipped(tmp_path):
+    ready = write_aggregates(tmp_path / "ready.csv", ["2025-01-10"])
+    stale = write_aggregates(tmp_path / "stale.csv", ["2025-01-09"])
+    config = job_config([
+        {"name": "本店", "aggregates_path": ready, "recipients": ["+81001"]},
+        {"name": "支店", "aggregates_path": stale, "recipients": ["+81001"]},
+        {"name": "新店", "aggregates_path": str(tmp_path / "missing.csv"), "recipients": ["+81002"]},
+    ])
+    notifier = FakeNotifier()
+    metrics = asyncio.run(run_job(config, notifier, TARGET))
+
+    assert metrics.skipped == 2
+    assert len(metrics.errors) == 2
+    assert [message.to for message in notifier.sent] == ["+81001"]
+    assert "【支店】" not in notifier.sent[0].body
+
+
+def test_split_body_keeps_lines_within_limit():
+    lines = [f"line{i:02d}" for i in range(10)]
+    parts = split_body("\n".join(lines), max_length=20)
+    assert all(len(part) <= 20 for part in parts)
+    assert "\n".join(parts).split("\n") == lines
+
+    assert split_body("x" * 50, max_length=20) == ["x" * 20]
+    assert split_body("short") == ["short"]
+
+
+class CountingNotifier(FakeNotifier):
+    """同時に送信中の件数の最大値と送信時刻を記録する"""
+
+    def __init__(self, latency):
+        super().__init__(latency=latency)
+        self.active = 0
+        self.max_active = 0
+        self.times = []
+
+    async def send(self, message):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        self.times.append(asyncio.get_running_loop().time())
+        try:
+            return await super().send(message)
+        finally:
+            self.active -= 1
+
+
+def test_send_batch_limits_concurrency():
+    notifier = CountingNotifier(latency=0.02)
+    messages = [SMSMessage(f"+8100{i}", "body") for i in range(6)]
+    results = asyncio.run(send_batch(notifier, messages, concurrency=2, rate_per_sec=0))
+    assert all(result.ok for result in results)
+    assert notifier.max_active == 2
+
+
+def test_send_batch_limits_rate():
+    notifier = CountingNotifier(latency=0)
+    messages = [SMSMessage(f"+8100{i}", "body") for i in range(5)]
+    asyncio.run(send_batch(notifier, messages, concurrency=5, rate_per_sec=20))
+    gaps = [later - earlier for earlier, later in zip(notifier.times, notifier.times[1:])]
+    assert min(gaps) >= 0.05 * 0.9
@@ -0,0 +1,55 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from dailysalesdashboard import snapshots
+from dailysalesdashboard.utils import build_sales_records
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = []
+    for month in (1, 2):
+        records.extend(build_sales_records(f"2025-{month:02d}-10", {"lunch": 1000, "dinner": 2000}))
+    return pd.DataFrame(records)
+
+
+def object_path(digest):
+    return os.path.join(snapshots.OBJECT_DIR, f"{digest}.csv.gz")
+
+
+def age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_shared_object_is_not_collected_before_manifest(data):
+    snapshot_id = snapshots.record_snapshot(data, reason="test")
+    digest = snapshots.load_snapshot(snapshot_id)["months"]["2025-01"]
+    age(object_path(digest), snapshots.OBJECT_GRACE_SECONDS * 2)
+
+    # 他のセッションの保持ポリシーで、まだマニフェストに書かれていないオブジェクトが消されないこと
+    os.remove(os.path.join(snapshots.MANIFEST_DIR, f"{snapshot_id}.json"))
+    snapshots._store_month(data[data["日付"].str.startswith("2025-01")])
+    snapshots.record_snapshot(data, reason="other session")
+    snapshots.apply_retention(keep_last=1)
+    assert os.path.exists(object_path(digest))
+
+
+def test_unreferenced_old_objects_are_collected(data):
+    first = snapshots.record_snapshot(data, reason="first")
+    old_digest = snapshots.load_snapshot(first)["months"]["2025-01"]
+    changed = data.copy()
+    changed.loc[changed["日付"] == "2025-01-10", "売上金額"] += 1
+    time.sleep(0.01)
+    snapshots.record_snapshot(changed, ["2025-01"], reason="second")
+
+    snapshots.apply_retention(keep_last=1)
+    assert os.path.exists(object_path(old_digest))  # 猶予時間内は残す
+
+    age(object_path(old_digest), snapshots.OBJECT_GRACE_SECONDS * 2)
+    snapshots.apply_retention(keep_last=1)
+    assert not os.path.exists(object_path(old_digest))
@@ -0,0 +1,114 @@
+import os
+
+import pandas as pd
+import pytest
+
+from dailysalesdashboard import utils
+from dailysalesdashboard.utils import build_sales_records, delete_range, load_data, load_tombstones, save_data
+
+
+@pytest.fixture
+def legacy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = []
+    for month in (1, 2, 3):
+        records.extend(build_sales_records(f"2025-{month:02d}-10", {"lunch": 1000, "dinner": 2000}))
+    pd.DataFrame(records).to_csv(utils.LEGACY_DATA_PATH, index=False)
+    return len(records)
+
+
+def test_migration_moves_legacy_file(legacy):
+    assert len(load_data()) == legacy
+    assert sorted(os.listdir(utils.PARTITION_DIR)) == ["2025-01.csv", "2025-02.csv", "2025-03.csv"]
+    assert os.path.exists(f"{utils.LEGACY_DATA_PATH}.migrated")
+
+
+def test_failed_migration_keeps_legacy_file(legacy, monkeypatch):
+    to_csv = pd.DataFrame.to_csv
+    calls = []
+
+    def failing_to_csv(self, *args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return to_csv(self, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, "to_csv", failing_to_csv)
+    assert load_data().empty
+    assert not os.path.exists(utils.PARTITION_DIR)
+    assert os.path.exists(utils.LEGACY_DATA_PATH)
+    assert os.listdir(".") == [utils.LEGACY_DATA_PATH]
+
+    # 次の読み込みで最初から移行し直す
+    monkeypatch.setattr(pd.DataFrame, "to_csv", to_csv)
+    assert len(load_data()) == legacy
+
+
+def test_migration_by_another_session(legacy, monkeypatch):
+    # 存在確認の後に他のセッションが移行を終えた場合は、移行済みのパーティションを読む
+    other_session = utils._migrate_legacy
+    monkeypatch.setattr(utils, "_migrate_legacy", lambda: (other_session(), other_session()))
+    assert len(load_data()) == legacy
+
+
+@pytest.fixture
+def partitions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    records = []
+    for month in (1, 2, 3):
+        for day in (5, 15, 25):
+            records.extend(build_sales_records(f"2025-{month:02d}-{day:02d}", {"lunch": 1000, "dinner": 2000}))
+    data = pd.DataFrame(records)
+    assert save_data(data)
+    return data
+
+
+def saved_dates():
+    return sorted(set(load_data()["日付"]))
+
+
+def test_delete_full_month_removes_partition(partitions):
+    data, months, ok = delete_range(partitions, "2025-02-01", "2025-02-28")
+    assert ok and months == ["2025-02"]
+    assert not os.path.exists(utils._partition_path("2025-02"))
+    assert load_tombstones() == []
+    assert saved_dates() == sorted(set(data["日付"]))
+    assert not any(date.startswith("2025-02") for date in saved_dates())
+
+
+def test_delete_partial_month_writes_tombstone(partitions):
+    data, _, ok = delete_range(partitions, "2025-03-10", "2025-03-20")
+    assert ok
+    # パーティションは書き直さず、トゥームストーンで読み込み時に除外する
+    assert "2025-03-15" in set(pd.read_csv(utils._partition_path("2025-03"), dtype={"日付": str})["日付"])
+    assert load_tombstones() == [{"month": "2025-03", "start": "2025-03-10", "end": "2025-03-20"}]
+    assert "2025-03-15" not in saved_dates()
+    assert saved_dates() == sorted(set(data["日付"]))
+
+
+def test_save_month_clears_its_tombstones(partitions):
+    data, _, _ = delete_range(partitions, "2025-01-10", "2025-01-20")
+    data, _, _ = delete_range(data, "2025-03-01", "2025-03-10")
+    assert save_data(data, ["2025-01"])
+    assert [tombstone["month"] for tombstone in load_tombstones()] == ["2025-03"]
+    assert "2025-01-15" not in set(pd.read_csv(utils._partition_path("2025-01"), dtype={"日付": str})["日付"])
+    assert saved_dates() == sorted(set(data["日付"]))
+
+
+def test_compaction_after_threshold(partitions):
+    data = partitions
+    days = [f"2025-{month:02d}-{day:02d}" for month in (1, 2, 3) for day in range(1, 29, 3)]
+    for day in days[:utils.COMPACT_THRESHOLD]:
+        data, _, ok = delete_range(data, day, day)
+        assert ok
+    assert len(load_tombstones()) == utils.COMPACT_THRESHOLD
+
+    # しきい値を超えた時点でパーティションを書き直し、トゥームストーンを削除する
+    data, _, _ = delete_range(data, days[utils.COMPACT_THRESHOLD], days[utils.COMPACT_THRESHOLD])
+    assert load_tombstones() == []
+    assert saved_dates() == sorted(set(data["日付"]))
+    for month in ("2025-01", "2025-02", "2025-03"):
+        path = utils._partition_path(month)
+        if os.path.exists(path):
+            written = set(pd.read_csv(path, dtype={"日付": str})["日付"])
+            assert written == {date for date in data["日付"] if date.startswith(month)}